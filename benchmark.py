@@ -0,0 +1,57 @@
+"""Producer/consumer benchmark for channels, run with `python benchmark.py`.
+
+Prints throughput, count of microasync objects (promises, channels,
+blocks) allocated per message and peak memory with and without
+promises pool.
+
+"""
+from time import time
+import tracemalloc
+from microasync import utils
+from microasync.async import Channel, coroutine, process_all, ready
+
+MESSAGES = 100000
+
+
+def _allocated():
+    """Count of `WithEquality` objects created so far."""
+    return utils.WithEquality._counter
+
+
+def run(pool):
+    utils.set_promises_pool(pool)
+    chan = Channel()
+    done = []
+
+    @coroutine
+    def producer():
+        for n in range(MESSAGES):
+            yield chan.put(n)
+
+    @coroutine
+    def consumer():
+        for _ in range(MESSAGES):
+            yield chan.get()
+        done.append(True)
+
+    tracemalloc.start()
+    allocated = _allocated()
+    started = time()
+    producer()
+    consumer()
+    while ready:
+        process_all()
+    elapsed = time() - started
+    allocated = _allocated() - allocated
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    utils.set_promises_pool(0)
+    assert done
+    print('pool={:<6} {:>10.0f} msg/s {:>6.2f} objects/msg'
+          ' {:>8} KiB peak'.format(pool, MESSAGES / elapsed,
+                                   allocated / MESSAGES, peak // 1024))
+
+
+if __name__ == '__main__':
+    run(0)
+    run(64)
@@ -1,8 +1,291 @@
-from microasync.utils import Promise, WithEquality
+from collections import deque
+from heapq import heappush, heappop, heapify
+from microasync.utils import Promise, WithEquality, _PooledPromise
 from time import time, sleep
+try:
+    from traceback import print_exception
+
+    def _print_error(error):
+        print_exception(type(error), error, error.__traceback__)
+except ImportError:
+    from sys import print_exception as _print_error  # micropython
+
+
+# Objects with `process` method which should be processed on next pass:
+ready = deque()
+# Min-heap of `[deadline, seq, delay]` entries of pending delays:
+timers = []
+_timers_seq = [0]
+_cancelled_timers = [0]
+# Sleep interval when there's no ready items and no pending timers:
+IDLE_TIMEOUT = 1
+# Max sleep of default waiter while thread safe channels exist:
+SIGNAL_CHECK_INTERVAL = 0.01
+# Called when loop should stop waiting, used by external event loops:
+_wakeup = [None]
+# Callbacks scheduled from other threads:
+_incoming = deque()
+# Thread safe channels and flag which set when any of them received items:
+_threadsafe_chans = []
+_threadsafe_signal = [False]
+
+
+def _report_error(block, error):
+    """Default handler of unhandled errors, prints traceback."""
+    _print_error(error)
+
+# Called with coroutine block and exception when nobody waits for block:
+_error_handler = [_report_error]
+
+
+class Waiter(object):
+    """Blocks main loop between passes, default implementation just sleeps
+    and can't be notified. While thread safe channels exist it sleeps in
+    short slices and stops when any of them received items, so items put
+    from interrupt handlers are processed without waiting for timeout."""
+
+    def wait(self, timeout):
+        """Waits until timeout or notification.
+
+        :param timeout: Timeout in seconds.
+        :type timeout: float
 
+        """
+        if not _threadsafe_chans:
+            sleep(timeout)
+            return
+        deadline = time() + timeout
+        while not (_threadsafe_signal[0] or _incoming):
+            left = deadline - time()
+            if left <= 0:
+                break
+            sleep(min(left, SIGNAL_CHECK_INTERVAL))
+
+    def notify(self):
+        """Wakes up waiting loop, should be thread safe."""
+
+    def poll(self):
+        """Checks for events without blocking, called instead of `wait`
+        when loop has ready items."""
+
+
+_waiter = [Waiter()]
+
+
+def get_waiter():
+    """Returns current waiter of main loop."""
+    return _waiter[0]
+
+
+def set_waiter(waiter):
+    """Sets waiter of main loop.
+
+    :type waiter: Waiter
+
+    """
+    _waiter[0] = waiter
+
+
+def call_soon_threadsafe(fn, *args):
+    """Schedules call of `fn` on the next pass of main loop, the only
+    function safe for calling from other threads.
+
+    :param fn: Function for calling.
+
+    """
+    _incoming.append((fn, args))
+    _waiter[0].notify()
+
+
+def set_error_handler(fn):
+    """Sets handler of errors in coroutines which nobody waits for, by
+    default traceback printed and loop keeps working.
+
+    Usage:
+
+    .. code-block:: python
+
+        set_error_handler(lambda block, error: log.append(error))
+
+    :param fn: Function which receives coroutine block and exception.
+
+    """
+    _error_handler[0] = fn or _report_error
+
+
+def set_wakeup(fn):
+    """Sets function which will be called when ready queue becomes not
+    empty or nearest timer changes. Internal use only!
+
+    :param fn: Function without arguments or `None`.
+
+    """
+    _wakeup[0] = fn
+
+
+def schedule(item):
+    """Puts item to ready queue. Internal use only!"""
+    if not ready and _wakeup[0] is not None:
+        _wakeup[0]()
+    ready.append(item)
+
+
+def _push_timer(entry, deadline):
+    """Puts timer entry to the heap. Internal use only!"""
+    entry[0] = deadline
+    entry[1] = _timers_seq[0]
+    _timers_seq[0] += 1
+    heappush(timers, entry)
+    if timers[0] is entry and _wakeup[0] is not None:
+        _wakeup[0]()
+
+
+def _process_timers():
+    """Delivers all expired delays."""
+    now = time()
+    while timers and timers[0][0] <= now:
+        delay = heappop(timers)[2]
+        if delay is None:
+            _cancelled_timers[0] -= 1
+        else:
+            delay._expire()
+
+
+def _cancel_timer(entry):
+    """Marks timer entry as cancelled, rebuilds heap when most of entries
+    are cancelled."""
+    entry[2] = None
+    _cancelled_timers[0] += 1
+    if _cancelled_timers[0] > 32 and _cancelled_timers[0] * 2 > len(timers):
+        timers[:] = [item for item in timers if item[2] is not None]
+        heapify(timers)
+        _cancelled_timers[0] = 0
+
+
+def next_timeout():
+    """Returns seconds until something should be processed or `None` when
+    there's nothing to wait. Internal use only!"""
+    if ready or _incoming or _threadsafe_signal[0]:
+        return 0
+    elif timers:
+        return max(0, timers[0][0] - time())
+    else:
+        return None
+
+
+class Cancelled(Exception):
+    """Thrown into coroutine by `CoroutineBlock.cancel`."""
+
+
+class _Operation(Promise):
+    """Promise of operation owned by single coroutine, like channel getter
+    or result of `alts`. Abandoned when coroutine cancelled, so value isn't
+    delivered to nobody. Internal use only!"""
+    __slots__ = ()
+
+
+class _Expiring(_Operation):
+    """Promise which delivered with `default` after timeout. Abandoned
+    in channel queue on expiration. Internal use only!"""
+    __slots__ = ('_delay',)
+
+    def __init__(self, timeout, default):
+        super(_Expiring, self).__init__()
+        self._delay = Delay(timeout)
+        self._delay.on_delivery(lambda _: self.delivery(default))
+
+    def delivery(self, value):
+        if super(_Expiring, self).delivery(value):
+            self._delay.cancel()
+            return True
+        else:
+            return False
+
+
+class _BatchPromise(_Operation):
+    """Promise for batch operations with channel. Internal use only!"""
+    __slots__ = ('size',)
+
+    def __init__(self, size=None):
+        super(_BatchPromise, self).__init__()
+        self.size = size
+
+
+class FixedBuffer(object):
+    """Buffer of channel which holds up to `limit` items, putters wait
+    when it's full."""
+    __slots__ = ('_items', '_limit', 'dropped')
+
+    def __init__(self, limit=1):
+        """
+        :param limit: Max count of items.
+        :type limit: int
+
+        """
+        self._items = deque()
+        self._limit = limit
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, val):
+        """Puts item in buffer.
+
+        :returns: `False` when buffer can't accept item.
+        :rtype: bool
+
+        """
+        if len(self._items) < self._limit:
+            self._items.append(val)
+            return True
+        else:
+            return False
+
+    def take(self):
+        """Removes and returns the oldest item."""
+        return self._items.popleft()
+
+
+class DroppingBuffer(FixedBuffer):
+    """Buffer which never blocks putters, new items dropped when it's
+    full."""
+    __slots__ = ()
 
-processable = []
+    def put(self, val):
+        if len(self._items) < self._limit:
+            self._items.append(val)
+        else:
+            self.dropped += 1
+        return True
+
+
+class SlidingBuffer(FixedBuffer):
+    """Buffer which never blocks putters, the oldest item dropped when
+    it's full."""
+    __slots__ = ()
+
+    def __init__(self, limit=1):
+        super(SlidingBuffer, self).__init__(limit)
+        self._items = deque((), limit)
+
+    def put(self, val):
+        if len(self._items) == self._limit:
+            self.dropped += 1
+        self._items.append(val)
+        return True
+
+
+class UnboundedBuffer(FixedBuffer):
+    """Buffer without limit, never blocks putters."""
+    __slots__ = ()
+
+    def __init__(self):
+        super(UnboundedBuffer, self).__init__(None)
+
+    def put(self, val):
+        self._items.append(val)
+        return True
 
 
 class Channel(WithEquality):
@@ -17,100 +300,344 @@ class Channel(WithEquality):
         result = yield chan.get()  # gets value from channel
         print(result)  # prints 'test'
 
+    Buffer policy can be changed with `buffer`:
+
+    .. code-block:: python
+
+        chan = Channel(buffer=SlidingBuffer(10))
+        print(chan.buffer.dropped)  # prints count of dropped items
+
     """
+    __slots__ = ('_buffer', '_get_queue', '_put_queue', 'closed', 'clones')
+    _buffer_type = FixedBuffer
 
-    def __init__(self, limit=1):
+    def __init__(self, limit=1, buffer=None):
         """
 
         :param limit: Limit of object in channel.
         :type limit: int
+        :param buffer: Buffer of channel, buffer of channel type with
+                       `limit` used by default.
+        :type buffer: FixedBuffer
 
         """
         super(Channel, self).__init__()
-        self._messages = []
-        self._get_queue = []
-        self._put_queue = []
-        self._limit = limit
+        self._buffer = self._buffer_type(limit) if buffer is None else buffer
+        self._get_queue = deque()
+        self._put_queue = deque()
         self.closed = False
-        processable.append(self)
         self.clones = []
 
-    def get(self):
+    @property
+    def buffer(self):
+        """Buffer of channel."""
+        return self._buffer
+
+    def get(self, timeout=None):
         """Get item from channel.
 
+        :param timeout: Timeout in seconds, after which promise delivered
+                        with `None` and getter removed from channel.
+        :type timeout: float
         :returns: Promise for getting item from channel.
         :rtype: Promise
 
         """
-        prom = Promise()
-        self._get_queue.append(prom)
+        if timeout is None:
+            prom = Promise.acquire()
+        else:
+            prom = _Expiring(timeout, None)
+        self._add_getter(prom)
         return prom
 
-    def put(self, val):
+    def put(self, val, timeout=None):
         """Put item in channel.
 
+        :param timeout: Timeout in seconds, after which promise delivered
+                        with `False` and item not put.
+        :type timeout: float
         :returns: Promise for putting item in channel.
         :rtype: Promise
 
         """
-        prom = Promise()
-        self._put_queue.append((prom, val))
+        if timeout is None:
+            prom = Promise.acquire()
+        else:
+            prom = _Expiring(timeout, False)
+        getters = self._get_queue
+        while getters and getters[0].delivered:
+            getters.popleft()
+        if getters and not (self._buffer or self._put_queue
+                            or self.closed):
+            # Rendezvous with parked getter, item bypasses buffer:
+            prom.delivery(True)
+            getter = self._get_queue.popleft()
+            getter.delivery([val] if isinstance(getter, _BatchPromise)
+                            else val)
+        else:
+            self._put_queue.append((prom, val))
+            self.process()
+        return prom
+
+    def get_many(self, max_n):
+        """Get up to `max_n` items from channel at once. Promise delivered
+        when at least one item available, or with empty list when
+        channel closed.
+
+        :param max_n: Max count of items.
+        :type max_n: int
+        :returns: Promise for getting list of items.
+        :rtype: Promise
+
+        """
+        prom = _BatchPromise(max_n)
+        self._add_getter(prom)
         return prom
 
+    def put_many(self, items):
+        """Put all items in channel, as many items as channel can hold are
+        moved at once. Promise delivered when all items are in channel.
+
+        :param items: Items for putting.
+        :type items: collections.Iterable
+        :returns: Promise for putting items in channel.
+        :rtype: Promise
+
+        """
+        prom = _BatchPromise()
+        self._put_queue.append((prom, deque(items)))
+        self.process()
+        return prom
+
+    def close(self):
+        """Closes channel, all pending and future `get` will receive `None`
+        and `put` will receive `False`."""
+        self.closed = True
+        self.process()
+
+    def _add_getter(self, prom, process=True):
+        """Adds promise to `get` queue. Getters abandoned by `alts` are
+        dropped from the end of queue, the rest are skipped lazily."""
+        while self._get_queue and self._get_queue[-1].delivered:
+            self._get_queue.pop()
+        self._get_queue.append(prom)
+        if process:
+            self.process()
+
+    def _remove_putter(self, prom):
+        """Removes pending put, so its promise can be recycled while item
+        isn't taken from channel."""
+        for n, (putter, _) in enumerate(self._put_queue):
+            if putter is prom:
+                del self._put_queue[n]
+                return
+
     def _process_get(self):
         """Tries to delivery all promises in `get` queue."""
-        for prom in self._get_queue:
-            if self.closed:
-                prom.delivery(None)
-            elif self._messages:
-                prom.delivery(self._messages.pop(0))
+        while self._get_queue:
+            prom = self._get_queue[0]
+            if prom.delivered:
+                self._get_queue.popleft()
+                continue
+            batch = isinstance(prom, _BatchPromise)
+            if self._buffer or self._has_putter():
+                val = self._take(prom.size) if batch else self._take_one()
+            elif self.closed:
+                val = [] if batch else None
             else:
                 break
-            self._get_queue.remove(prom)
-
-    def _try_put(self, val):
-        """Tries to put item in queue."""
-        if len(self._messages) <= self._limit:
-            self._messages.append(val)
-            return True
+            self._get_queue.popleft()
+            prom.delivery(val)
+
+    def _take(self, n):
+        """Takes up to `n` items from buffer, refills buffer from
+        `put` queue when it's exhausted."""
+        items = []
+        while len(items) < n:
+            if not self._buffer:
+                self._process_put()
+                if not (self._buffer or self._has_putter()):
+                    break
+            items.append(self._take_one())
+        return items
+
+    def _take_one(self):
+        """Takes item from buffer or directly from the oldest putter
+        when buffer is empty."""
+        if self._buffer:
+            return self._buffer.take()
+        prom, val = self._put_queue[0]
+        if isinstance(prom, _BatchPromise):
+            item = val.popleft()
+            if val:
+                return item
         else:
-            return False
+            item = val
+        self._put_queue.popleft()
+        prom.delivery(True)
+        return item
+
+    def _has_putter(self):
+        """Drops abandoned putters, returns `True` when somebody waits
+        for putting item."""
+        while self._put_queue and self._put_queue[0][0].delivered:
+            self._put_queue.popleft()
+        return bool(self._put_queue)
 
     def _process_put(self):
-        """Tries to delivery all promises in `put` queue."""
-        for prom, val in self._put_queue:
-            if self.closed:
+        """Tries to delivery all promises in `put` queue in fifo order."""
+        while self._put_queue:
+            prom, val = self._put_queue[0]
+            if prom.delivered:
+                pass  # putter abandoned
+            elif self.closed:
                 prom.delivery(False)
-                self._put_queue.remove((prom, val))
-            elif self._try_put(val):
+            elif isinstance(prom, _BatchPromise):
+                while val and self._buffer.put(val[0]):
+                    val.popleft()
+                if val:
+                    break
                 prom.delivery(True)
-                self._put_queue.remove((prom, val))
+            elif self._buffer.put(val):
+                prom.delivery(True)
+            else:
+                break
+            self._put_queue.popleft()
 
     def process(self):
-        """Process promises in queue. For internal use only!"""
-        self._process_put()
-        self._process_get()
+        """Process promises in queue. Called on each `get`, `put` and `close`,
+        so promises are delivered immediately. For internal use only!"""
+        while True:
+            waiting = len(self._put_queue) + len(self._get_queue)
+            self._process_put()
+            self._process_get()
+            if waiting == len(self._put_queue) + len(self._get_queue):
+                break
 
 
 class SlidingChannel(Channel):
     """Channel in which new items overwrites old."""
+    __slots__ = ()
+    _buffer_type = SlidingBuffer
+
+
+class _NobodyWaits(Promise):
+    """Promise for putting items without waiting for result, never
+    delivered. Internal use only!"""
+    __slots__ = ()
+
+    def delivery(self, value):
+        return True
+
+
+_nobody_waits = _NobodyWaits()
+
 
-    def _try_put(self, val):
-        """Puts item in queue and overwrites exists."""
-        self._messages.append(val)
-        self._messages = self._messages[-self._limit:]
+class DroppingChannel(Channel):
+    """Channel in which new items dropped when it's full."""
+    __slots__ = ()
+    _buffer_type = DroppingBuffer
+
+
+class ThreadSafeChannel(Channel):
+    """Channel which accepts items from other threads and interrupt
+    handlers with `put_threadsafe`. Items are stored in preallocated ring,
+    so putting doesn't allocate memory, and moved to channel by scheduler.
+
+    Usage:
+
+    .. code-block:: python
+
+        chan = ThreadSafeChannel()
+        pyb.Switch().callback(lambda: chan.put_threadsafe(True))
+        while True:
+            yield chan.get()
+            print('clicked!')
+
+    """
+    __slots__ = ('_ring', '_head', '_tail', '_lock', 'dropped')
+
+    def __init__(self, limit=1, ring_size=32, lock=None, buffer=None):
+        """
+        :param limit: Limit of object in channel.
+        :type limit: int
+        :param buffer: Buffer of channel.
+        :type buffer: FixedBuffer
+        :param ring_size: Count of items which can wait for scheduler.
+        :type ring_size: int
+        :param lock: Lock for putting from many threads at once,
+                     not needed for single producer.
+
+        """
+        super(ThreadSafeChannel, self).__init__(limit, buffer)
+        self._ring = [None] * (ring_size + 1)
+        self._head = 0
+        self._tail = 0
+        self._lock = lock
+        self.dropped = 0
+        _threadsafe_chans.append(self)
+        try:
+            from microasync.threads import install_waiter
+            install_waiter()
+        except ImportError:
+            pass  # no threads, default waiter checks signal of channels
+
+    def put_threadsafe(self, val):
+        """Puts item in channel without waiting, safe for calling from
+        other threads and interrupt handlers.
+
+        :returns: `False` when ring is full and item dropped.
+        :rtype: bool
+
+        """
+        if self._lock is None:
+            return self._put_ring(val)
+        with self._lock:
+            return self._put_ring(val)
+
+    def _put_ring(self, val):
+        tail = self._tail
+        next_tail = (tail + 1) % len(self._ring)
+        if next_tail == self._head:
+            self.dropped += 1
+            return False
+        self._ring[tail] = val
+        self._tail = next_tail
+        _threadsafe_signal[0] = True
+        _waiter[0].notify()
         return True
 
+    def close(self):
+        super(ThreadSafeChannel, self).close()
+        if self in _threadsafe_chans:
+            _threadsafe_chans.remove(self)
+
+    def process(self):
+        """Moves items from ring while channel can accept them. For internal
+        use only!"""
+        while self._head != self._tail and not self._put_queue:
+            val = self._ring[self._head]
+            self._ring[self._head] = None
+            self._head = (self._head + 1) % len(self._ring)
+            self._put_queue.append((_nobody_waits, val))
+            super(ThreadSafeChannel, self).process()
+        super(ThreadSafeChannel, self).process()
+
 
 class CoroutineBlock(Promise):
     """Similar to go-block in core.async. Internal use only!"""
+    __slots__ = ('_gen', '_last_promise')
 
     def __init__(self, gen):
         super(CoroutineBlock, self).__init__()
         self._gen = gen
         self._last_promise = Promise()
         self._last_promise.delivery(None)
-        processable.append(self)
+        if hasattr(gen, 'send'):
+            schedule(self)
+        else:
+            # decorated function isn't generator, it's already finished:
+            self.delivery(gen)
 
     @property
     def parked(self):
@@ -118,20 +645,66 @@ class CoroutineBlock(Promise):
         return not self._last_promise.delivered
 
     def process(self):
-        """Process promises returned by coroutine generator."""
-        if not self.parked:
+        """Process promises returned by coroutine generator. Exception of
+        awaited promise thrown into generator, exception raised from
+        generator rejects block."""
+        if not self.parked and not self.delivered:
+            prom = self._last_promise
+            value = prom.value
+            error = prom.error
+            prom.release()
             try:
-                self._last_promise = self._gen.send(self._last_promise.value)
+                if error is None:
+                    prom = self._gen.send(value)
+                else:
+                    prom = self._gen.throw(error)
+                self._last_promise = prom
+                prom.on_delivery(self._wake)
             except StopIteration as e:
                 self.delivery(e.value)
-                self._close()
-            except AttributeError:
-                self.delivery(self._gen)
-                self._close()
+            except Exception as e:
+                self._fail(e)
+
+    def cancel(self):
+        """Cancels coroutine, throws `Cancelled` into it and abandons
+        channel operation which coroutine waits for. Coroutine can catch
+        `Cancelled` for cleanup.
+
+        :returns: `True` when coroutine finished.
+        :rtype: bool
+
+        """
+        if self.delivered:
+            return False
+        prom = self._last_promise
+        self._last_promise = _nobody_waits
+        if isinstance(prom, (_Operation, _PooledPromise)):
+            prom.delivery(None)
+        elif prom.__class__ is _Gather:
+            prom.cancel()
+        try:
+            self._last_promise = self._gen.throw(Cancelled())
+        except StopIteration as e:
+            self.delivery(e.value)
+        except Cancelled:
+            self.delivery(None)
+        except Exception as e:
+            self._fail(e)
+        else:
+            self._last_promise.on_delivery(self._wake)
+        return self.delivered
+
+    def _fail(self, error):
+        """Rejects block, error passed to handler of unhandled errors when
+        nobody waits for block."""
+        if self._callbacks is None:
+            _error_handler[0](self, error)
+        self.reject(error)
 
-    def _close(self):
-        """Removes self from list of active coroutine blocks."""
-        processable.remove(self)
+    def _wake(self, promise):
+        """Schedules block when awaited promise delivered."""
+        if promise is self._last_promise:
+            schedule(self)
 
 
 def coroutine(fnc):
@@ -148,6 +721,14 @@ def coroutine(fnc):
         my_coroutine()
         loop()  # corouitnes starts working only after starting main loop
 
+    Native coroutines are supported too, promises are awaitable:
+
+    .. code-block:: python
+
+        @coroutine
+        async def my_coroutine(chan):
+            print(await chan.get())
+
     """
     def wrapper(*args, **kwargs):
         return CoroutineBlock(fnc(*args, **kwargs))
@@ -155,16 +736,148 @@ def coroutine(fnc):
 
 
 def process_all():
-    """Process all promises. Internal use only!"""
-    for item in processable[:]:
-        item.process()
+    """Process expired timers and all items which was ready before the call.
+    Internal use only!"""
+    while _incoming:
+        fn, args = _incoming.popleft()
+        fn(*args)
+    if _threadsafe_signal[0]:
+        _threadsafe_signal[0] = False
+        for chan in _threadsafe_chans:
+            chan.process()
+    _process_timers()
+    for _ in range(len(ready)):
+        ready.popleft().process()
+
+
+def _wait_next():
+    """Waits exactly until the nearest timer expires or waiter notified."""
+    timeout = next_timeout()
+    if timeout is None:
+        _waiter[0].wait(IDLE_TIMEOUT)
+    elif timeout:
+        _waiter[0].wait(timeout)
+    else:
+        _waiter[0].poll()
 
 
 def loop():
     """Starts main loop."""
     while True:
         process_all()
-        sleep(0.1)
+        _wait_next()
+
+
+def run_until(promise):
+    """Runs main loop until promise delivered.
+
+    Usage:
+
+    .. code-block:: python
+
+        result = run_until(main_coroutine())
+
+    Error of rejected promise raised from `run_until`.
+
+    :param promise: Promise or coroutine block.
+    :type promise: Promise
+    :returns: Value of promise.
+
+    """
+    while True:
+        process_all()
+        if promise.delivered:
+            if promise.error is not None:
+                raise promise.error
+            return promise.value
+        _wait_next()
+
+
+def reset():
+    """Drops all scheduled items, timers and thread safe channels and
+    restores default waiter. Should be called in forked processes."""
+    ready.clear()
+    del timers[:]
+    _incoming.clear()
+    del _threadsafe_chans[:]
+    _threadsafe_signal[0] = False
+    _wakeup[0] = None
+    _waiter[0] = Waiter()
+
+
+class Mult(WithEquality):
+    """Broadcasts items from source channel to all taps in a single step.
+    Waits until all taps accept item, so taps with sliding or dropping
+    buffers never block the others. Items are dropped when there's no taps.
+
+    Usage:
+
+    .. code-block:: python
+
+        mult = Mult(accel_chan)
+        first = mult.tap()
+        second = mult.tap(SlidingChannel())
+        ...
+        mult.untap(second)
+
+    """
+    __slots__ = ('_source', '_taps', '_pending')
+
+    def __init__(self, source):
+        """
+        :param source: Source channel.
+        :type source: Channel
+
+        """
+        super(Mult, self).__init__()
+        self._source = source
+        self._taps = []
+        self._pending = {}
+        CoroutineBlock(self._broadcast())
+
+    def tap(self, chan=None):
+        """Subscribes channel to items of source.
+
+        :param chan: Channel, new `Channel` created when it's `None`.
+        :type chan: Channel
+        :returns: Subscribed channel.
+        :rtype: Channel
+
+        """
+        if chan is None:
+            chan = Channel()
+        self._taps.append(chan)
+        return chan
+
+    def untap(self, chan):
+        """Unsubscribes channel, pending put into it abandoned.
+
+        :type chan: Channel
+
+        """
+        if chan in self._taps:
+            self._taps.remove(chan)
+        prom = self._pending.pop(chan, None)
+        if prom is not None:
+            chan._remove_putter(prom)
+            prom.delivery(False)
+
+    def _broadcast(self):
+        while True:
+            val = yield self._source.get()
+            if val is None and self._source.closed:
+                for chan in self._taps:
+                    chan.close()
+                return
+            for chan in self._taps:
+                prom = chan.put(val)
+                if not prom.delivered:
+                    self._pending[chan] = prom
+            for chan in list(self._pending):
+                prom = self._pending.get(chan)
+                if prom is not None:
+                    yield prom
+                    self._pending.pop(chan, None)
 
 
 def clone(chan, n, chan_type=SlidingChannel):
@@ -186,16 +899,8 @@ def clone(chan, n, chan_type=SlidingChannel):
     :rtype: list[U]
 
     """
-    result_chans = [chan_type() for _ in range(n)]
-
-    @coroutine
-    def aux():
-        while True:
-            val = yield chan.get()
-            for result_chan in result_chans:
-                yield result_chan.put(val)
-    aux()
-    return result_chans
+    mult = Mult(chan)
+    return [mult.tap(chan_type()) for _ in range(n)]
 
 
 class Delay(Promise):
@@ -219,6 +924,7 @@ class Delay(Promise):
             print('ok!')  # prints 'ok!' every 10 seconds
 
     """
+    __slots__ = ('_sec', '_timer', '_tick')
 
     def __init__(self, sec):
         """
@@ -227,20 +933,40 @@ class Delay(Promise):
 
         """
         super(Delay, self).__init__()
-        self._start = time()
         self._sec = sec
-        self.delivered = False
-        processable.append(self)
-
-    def process(self):
-        """Emulate interface of promises. Internal use only!"""
-        self.delivered = self._start + self._sec < time()
-        if self.delivered:
-            processable.remove(self)
+        self._tick = self
+        self._timer = [0, 0, self]
+        _push_timer(self._timer, time() + sec)
 
     def get(self):
-        """Emulate interface of channels."""
-        return Delay(self._sec)
+        """Emulate interface of channels. Rearms the same timer entry when
+        it's already expired, so periodic usage doesn't allocate new timers.
+        Each period has own promise, so all coroutines which wait for
+        expired period are woken up.
+
+        :returns: Promise of current period.
+        :rtype: Promise
+
+        """
+        if self._timer[2] is None:
+            self._timer = [0, 0, self]
+        elif self._tick.delivered:
+            self._tick = Promise()
+        else:
+            return self._tick
+        _push_timer(self._timer, time() + self._sec)
+        return self._tick
+
+    def cancel(self):
+        """Cancels pending delay, it won't be delivered until rearmed
+        with `get`."""
+        if not self._tick.delivered and self._timer[2] is not None:
+            self._tick._callbacks = None
+            _cancel_timer(self._timer)
+
+    def _expire(self):
+        """Delivers current period, called by scheduler."""
+        self._tick.delivery(None)
 
 
 class ChannelProducer(object):
@@ -262,23 +988,134 @@ class ChannelProducer(object):
         :type chan: Channel
 
         """
-        self._chan = chan
-        self._reserved_clone = chan
+        self._mult = Mult(chan)
 
-    def get_clone(self):
+    def get_clone(self, chan_type=SlidingChannel):
         """Creates a clone of original channel.
 
+        :param chan_type: Type of new channel.
+        :type chan_type: type[U]
         :returns: Created channel.
-        :rtype: Channel
+        :rtype: U
+
+        """
+        return self._mult.tap(chan_type())
+
+    def remove_clone(self, chan):
+        """Detaches clone from original channel.
+
+        :type chan: Channel
+
+        """
+        self._mult.untap(chan)
+
+
+class _AltsHandle(object):
+    """Getter registered by `alts` in channel, abandoned when any of
+    channels delivered value. Internal use only!"""
+    __slots__ = ('_result', '_chan')
+
+    def __init__(self, result, chan):
+        self._result = result
+        self._chan = chan
+
+    @property
+    def delivered(self):
+        return self._result.delivered
+
+    def delivery(self, value):
+        return self._result.delivery((self._chan, value))
+
+    def reject(self, error):
+        return self._result.reject(error)
+
+    def _deliver_from(self, promise):
+        if promise.error is None:
+            self.delivery(promise.value)
+        else:
+            self.reject(promise.error)
+
+
+_NO_DEFAULT = object()
+_alts_offset = [0]
+
+
+def alts(*chans, **kwargs):
+    """Gets item from the first ready channel. Works like `select` from go
+    or `alts!` from `core.async`. Should be used only inside coroutine.
+
+    Single waiter registered in all channels and abandoned in the rest of
+    them when the first delivered, so items never lost. Objects which
+    aren't channels, like `Delay`, supported too, but their values can be
+    lost.
+
+    Usage:
+
+    .. code-block:: python
+
+        chan, val = yield alts(delay_chan, trigger_chan)
+        if chan == delay_chan:
+            print('delay')
+        else:
+            print('trig by ', val)
+
+        chan, val = yield alts(trigger_chan, timeout=10)
+        if chan is None:
+            print('timeout')
+
+    :param chans: Channels from which we should get item.
+    :type chans: Channel
+    :param priority: Check channels in presented order, when `False` order
+                     rotated on each call for fairness.
+    :type priority: bool
+    :param default: Value which delivered as `(None, default)` when
+                    none of channels ready immediately.
+    :param timeout: Deliver `(None, None)` after timeout in seconds.
+    :type timeout: float
+    :returns: Promise for getting `(chan, value)`.
+    :rtype: Promise
+
+    """
+    timeout = kwargs.get('timeout')
+    result = _Operation() if timeout is None \
+        else _Expiring(timeout, (None, None))
+    if not kwargs.get('priority', False) and len(chans) > 1:
+        offset = _alts_offset[0] % len(chans)
+        _alts_offset[0] += 1
+        chans = chans[offset:] + chans[:offset]
+    for chan in chans:
+        if result.delivered:
+            break
+        if hasattr(chan, '_add_getter'):
+            chan._add_getter(_AltsHandle(result, chan))
+        else:
+            chan.get().on_delivery(_AltsHandle(result, chan)._deliver_from)
+    default = kwargs.get('default', _NO_DEFAULT)
+    if default is not _NO_DEFAULT:
+        result.delivery((None, default))
+    return result
+
+
+class Select(WithEquality):
+    """Channel-like object which returned by `select`."""
+    __slots__ = ('_chans',)
+
+    def __init__(self, chans):
+        super(Select, self).__init__()
+        self._chans = chans
+
+    def get(self):
+        """Get `(chan, value)` from the first ready channel.
+
+        :rtype: Promise
 
         """
-        self._reserved_clone, self._chan = clone(self._reserved_clone, 2)
-        return self._chan
+        return alts(*self._chans)
 
 
 def select(*chans):
-    """Creates a channel with works like fifo for messages from original
-    channels. Works like `select` from go or `alts!` from `core.async`.
+    """Creates a channel-like object for getting messages from original
+    channels, each `get` works like `alts`.
 
     Usage:
 
@@ -294,25 +1131,14 @@ def select(*chans):
 
     :param chans: Channels from which we should get items.
     :type chans: Channel
-    :returns: Channel with all `chans` items.
-    :rtype: Channel
+    :returns: Object with `get` method.
+    :rtype: Select
 
     """
-    chan = Channel()
-
-    @coroutine
-    def aux(chan_):
-        while True:
-            val = yield chan_.get()
-            yield chan.put((chan_, val))
-
-    for promise in chans:
-        aux(promise)
-
-    return chan
+    return Select(chans)
 
 
-def as_chan(create_chan):
+def as_chan(create_chan, supervisor=None):
     """Decorator which creates channel and coroutine. Passes channel as a
     first value to coroutine and returns that channel.
 
@@ -331,23 +1157,124 @@ def as_chan(create_chan):
             while True:
                 print((yield thermo_chan.get()))  # prints current temperature
 
+    With `supervisor` coroutine restarted with the same channel when it
+    fails:
+
+    .. code-block:: python
+
+        @as_chan(Channel, supervisor=sup)
+        def thermo(chan, unit):
+            ...
+
     :param create_chan: Type of channel.
     :type create_chan: type[Channel]
+    :param supervisor: Supervisor of coroutine.
+    :type supervisor: Supervisor
     :returns: Created coroutine.
 
     """
     def decorator(fn):
         def wrapped(*args, **kwargs):
             chan = create_chan()
-            coroutine(fn)(chan, *args, **kwargs)
+            if supervisor is None:
+                coroutine(fn)(chan, *args, **kwargs)
+            else:
+                supervisor.start_child(fn, chan, *args, **kwargs)
             return chan
         return wrapped
     return decorator
 
 
+ALL_COMPLETED = 'all_completed'
+FIRST_COMPLETED = 'first_completed'
+FIRST_EXCEPTION = 'first_exception'
+
+
+class _Gather(Promise):
+    """Promise which delivered when children finished, children are
+    watched with callbacks, so no helper coroutines or channels created.
+    Internal use only!"""
+    __slots__ = ('_children', '_values', '_left', '_mode')
+
+    def __init__(self, children, mode):
+        super(_Gather, self).__init__()
+        self._children = children
+        self._values = [None] * len(children)
+        self._left = len(children)
+        self._mode = mode
+        if not children:
+            self.delivery([])
+        for index, child in enumerate(children):
+            if self.delivered:
+                break
+            child.on_delivery(self._watcher(index))
+
+    def _watcher(self, index):
+        return lambda child: self._child_done(index, child)
+
+    def _child_done(self, index, child):
+        if self.delivered or self._mode is None:
+            return
+        if self._mode == FIRST_COMPLETED or (
+                child.error is not None and self._mode == FIRST_EXCEPTION):
+            if child.error is None:
+                self.delivery((child, child.value))
+            else:
+                self.reject(child.error)
+            self._cancel_children()
+            return
+        self._values[index] = child.value if child.error is None \
+            else child.error
+        self._left -= 1
+        if not self._left:
+            self.delivery(self._values)
+
+    def _cancel_children(self):
+        for child in self._children:
+            if not child.delivered and hasattr(child, 'cancel'):
+                child.cancel()
+
+    def cancel(self):
+        """Cancels all unfinished children, promise is never delivered
+        after it."""
+        if not self.delivered and self._mode is not None:
+            self._mode = None
+            self._cancel_children()
+
+
+def gather(*children, **kwargs):
+    """Waits for coroutines or promises started in parallel. Should be used
+    only inside coroutine.
+
+    Usage:
+
+    .. code-block:: python
+
+        users, posts = yield gather(get_users(), get_posts())
+
+        block, value = yield gather(fetch(primary), fetch(mirror),
+                                    mode=FIRST_COMPLETED)
+
+    When coroutine awaiting `gather` cancelled, all children cancelled too.
+
+    :param children: Coroutines or promises.
+    :type children: Promise
+    :param mode: `FIRST_EXCEPTION` for list of results in order of
+                 children, on the first error it's raised and the rest of
+                 coroutines cancelled. `ALL_COMPLETED` waits for all
+                 children, errors are placed in list instead of results.
+                 `FIRST_COMPLETED` for `(child, value)` of the first
+                 finished child, the rest of coroutines cancelled.
+    :returns: Promise for getting result.
+    :rtype: Promise
+
+    """
+    return _Gather(children, kwargs.get('mode', FIRST_EXCEPTION))
+
+
 def do_all(*chans):
-    """Creates new channel with single item from each of `chans` in sequential
-    order. Should be used only inside coroutine.
+    """Gets single item from each of `chans` in parallel, same as `gather`.
+    Should be used only inside coroutine.
 
     Usage:
 
@@ -355,20 +1282,126 @@ def do_all(*chans):
 
         led_state, trig_state = yield do_all(led_chan.get(), trig_chan.get())
 
-    :param chans: Channels from which we need to get items.
-    :type chans: Channel
-    :returns: Channel in which we put values from `chans`.
-    :rtype: Channel
+    :param chans: Promises from which we need to get items.
+    :type chans: Promise
+    :returns: Promise for getting list of values from `chans`.
+    :rtype: Promise
 
     """
-    result_chan = Channel()
+    return _Gather(chans, FIRST_EXCEPTION)
+
+
+ONE_FOR_ONE = 'one_for_one'
+ONE_FOR_ALL = 'one_for_all'
+
 
-    @coroutine
-    def aux():
-        result = []
-        for ch in chans:
-            result.append((yield ch))
-        yield result_chan.put(result)
-    aux()
-    return result_chan.get()
+class Supervisor(Promise):
+    """Restarts failed coroutines with the same arguments, so restarted
+    coroutine keeps working with the same channels. Coroutines which
+    finished without error aren't restarted.
 
+    Supervisor is a promise, which delivered when it stopped and rejected
+    with the last error when children failed too often, so supervisors
+    can be children of other supervisors.
+
+    Usage:
+
+    .. code-block:: python
+
+        sup = Supervisor(ONE_FOR_ONE, max_restarts=5, period=10)
+        readings = Channel()
+        sup.start_child(reader, sensor, readings)
+        sup.start_child(writer, readings, output)
+
+    """
+    __slots__ = ('_strategy', '_max_restarts', '_period', '_children',
+                 '_restarts')
+
+    def __init__(self, strategy=ONE_FOR_ONE, max_restarts=3, period=5):
+        """
+        :param strategy: `ONE_FOR_ONE` restarts only failed child,
+                         `ONE_FOR_ALL` cancels and restarts all children.
+        :param max_restarts: Max count of restarts during `period`, when
+                             it exceeded all children cancelled and
+                             supervisor rejected.
+        :type max_restarts: int
+        :param period: Period in seconds.
+        :type period: float
+
+        """
+        super(Supervisor, self).__init__()
+        self._strategy = strategy
+        self._max_restarts = max_restarts
+        self._period = period
+        self._children = []
+        self._restarts = deque()
+
+    def start_child(self, fn, *args, **kwargs):
+        """Starts supervised child.
+
+        :param fn: Generator function, function decorated with `coroutine`
+                   or function which returns promise, like other
+                   supervisor.
+        :returns: Started coroutine block.
+        :rtype: Promise
+
+        """
+        spec = [fn, args, kwargs, None]
+        self._children.append(spec)
+        self._start(spec)
+        return spec[3]
+
+    def stop(self):
+        """Cancels all children and delivers supervisor."""
+        if not self.delivered:
+            self._stop_children()
+            self.delivery(None)
+
+    def cancel(self):
+        """Same as `stop`, for nesting of supervisors."""
+        self.stop()
+        return True
+
+    def _start(self, spec):
+        child = spec[0](*spec[1], **spec[2])
+        if hasattr(child, 'send'):
+            child = CoroutineBlock(child)
+        spec[3] = child
+        child.on_delivery(lambda block: self._child_done(spec, block))
+
+    def _stop_children(self):
+        for spec in self._children:
+            child = spec[3]
+            spec[3] = None
+            if child is not None and not child.delivered \
+                    and hasattr(child, 'cancel'):
+                child.cancel()
+
+    def _child_done(self, spec, child):
+        """Restarts children according to strategy, stale notifications
+        from cancelled children are ignored."""
+        if self.delivered or child is not spec[3]:
+            return
+        if child.error is None:
+            self._children.remove(spec)
+            return
+        _error_handler[0](child, child.error)
+        if not self._can_restart():
+            self._stop_children()
+            self.reject(child.error)
+        elif self._strategy == ONE_FOR_ALL:
+            self._stop_children()
+            for spec in self._children:
+                self._start(spec)
+        else:
+            self._start(spec)
+
+    def _can_restart(self):
+        """Checks restart intensity."""
+        now = time()
+        while self._restarts and self._restarts[0] <= now - self._period:
+            self._restarts.popleft()
+        if len(self._restarts) >= self._max_restarts:
+            return False
+        self._restarts.append(now)
+        return True
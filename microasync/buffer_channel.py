@@ -0,0 +1,225 @@
+"""Zero-copy channel for binary payloads.
+
+Usage:
+
+.. code-block:: python
+
+    frames = BufferChannel(slots=4, slot_size=1024)
+
+    @coroutine
+    def producer():
+        while True:
+            view = yield frames.reserve()  # writable slot
+            frames.commit(adc.read_into(view))
+
+    @coroutine
+    def consumer():
+        while True:
+            frame = yield frames.get()  # memoryview of committed bytes
+            process(frame)
+            frames.release()
+
+"""
+from collections import deque
+from microasync.utils import Promise, WithEquality
+try:
+    import multiprocessing
+    from microasync.threads import ThreadPool
+except ImportError:
+    multiprocessing = None  # shared channels are available only on CPython
+
+_LENGTH_SIZE = 4
+
+
+class _LocalCounter(object):
+    """Counter of slots for channel used inside of one process."""
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = deque()
+
+    def acquire(self):
+        promise = Promise()
+        if self._value:
+            self._value -= 1
+            promise.delivery(True)
+        else:
+            self._waiters.append(promise)
+        return promise
+
+    def release(self):
+        if self._waiters:
+            self._waiters.popleft().delivery(True)
+        else:
+            self._value += 1
+
+
+class _SharedCounter(object):
+    """Counter of slots for channel shared between processes, waits in
+    own thread when counter is zero, so waiting doesn't occupy default
+    thread pool."""
+
+    def __init__(self, value, context):
+        self._semaphore = context.Semaphore(value)
+        self._waiter = None
+
+    def __getstate__(self):
+        return {'_semaphore': self._semaphore, '_waiter': None}
+
+    def acquire(self):
+        if self._semaphore.acquire(False):
+            promise = Promise()
+            promise.delivery(True)
+            return promise
+        if self._waiter is None:
+            self._waiter = ThreadPool(1)
+        return self._waiter.submit(self._semaphore.acquire)
+
+    def release(self):
+        self._semaphore.release()
+
+
+class BufferChannel(WithEquality):
+    """Channel with preallocated ring of fixed-size slots. Producer writes
+    directly into reserved slot and consumer receives `memoryview` of it,
+    so payloads are never copied.
+
+    With `shared=True` ring allocated in shared `multiprocessing.RawArray`
+    and channel can connect single producer and single consumer in
+    different processes, e.g. coroutines of `ShardedRuntime`. Shared
+    channel should be passed to processes on their start.
+
+    Slots should be committed and released in the order they were reserved
+    and received.
+
+    """
+
+    def __init__(self, slots=8, slot_size=4096, shared=False, context=None):
+        """
+        :param slots: Count of slots in ring.
+        :type slots: int
+        :param slot_size: Max size of payload in bytes.
+        :type slot_size: int
+        :param shared: Allocate ring in shared memory.
+        :type shared: bool
+        :param context: Multiprocessing context for shared channel.
+
+        """
+        super(BufferChannel, self).__init__()
+        self._slots = slots
+        self._slot_size = slot_size
+        size = slots * (slot_size + _LENGTH_SIZE)
+        if shared:
+            if multiprocessing is None:
+                raise RuntimeError('Shared channels require multiprocessing')
+            context = context or multiprocessing
+            self._shm = context.RawArray('B', size)
+            self._free = _SharedCounter(slots, context)
+            self._filled = _SharedCounter(0, context)
+        else:
+            self._shm = None
+            self._free = _LocalCounter(slots)
+            self._filled = _LocalCounter(0)
+        self._attach(bytearray(size) if self._shm is None else self._shm)
+
+    def _attach(self, buf):
+        """Creates views of data and lengths, resets local positions."""
+        data_size = self._slots * self._slot_size
+        buf = memoryview(buf).cast('B')
+        self._data = buf[:data_size]
+        self._lengths = buf[data_size:].cast('I')
+        self._reserved = 0
+        self._committed = 0
+        self._received = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ('_data', '_lengths'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        # id isn't shared, counter of other process can give it to others:
+        super(BufferChannel, self).__init__()
+        self.__dict__.update(state)
+        self._attach(self._shm)
+
+    def reserve(self):
+        """Reserves free slot for writing.
+
+        :returns: Promise delivered with writable `memoryview` of slot.
+        :rtype: Promise
+
+        """
+        promise = Promise()
+
+        def reserved(_):
+            start = self._reserved * self._slot_size
+            self._reserved = (self._reserved + 1) % self._slots
+            promise.delivery(self._data[start:start + self._slot_size])
+
+        self._free.acquire().on_delivery(reserved)
+        return promise
+
+    def commit(self, length):
+        """Makes the oldest reserved slot available for consumer.
+
+        :param length: Count of written bytes.
+        :type length: int
+
+        """
+        if length > self._slot_size:
+            raise ValueError('Payload larger than slot')
+        self._lengths[self._committed] = length
+        self._committed = (self._committed + 1) % self._slots
+        self._filled.release()
+
+    def put(self, data):
+        """Copies `data` into free slot, for compatibility with `Channel`.
+
+        :returns: Promise for putting item in channel.
+        :rtype: Promise
+
+        """
+        if len(data) > self._slot_size:
+            raise ValueError('Payload larger than slot')
+        promise = Promise()
+
+        def reserved(prom):
+            prom.value[:len(data)] = data
+            self.commit(len(data))
+            promise.delivery(True)
+
+        self.reserve().on_delivery(reserved)
+        return promise
+
+    def get(self):
+        """Get the oldest committed payload, slot stays occupied until
+        `release` called.
+
+        :returns: Promise delivered with `memoryview` of payload.
+        :rtype: Promise
+
+        """
+        promise = Promise()
+
+        def filled(_):
+            slot = self._received
+            self._received = (self._received + 1) % self._slots
+            start = slot * self._slot_size
+            promise.delivery(
+                self._data[start:start + self._lengths[slot]])
+
+        self._filled.acquire().on_delivery(filled)
+        return promise
+
+    def release(self):
+        """Returns the oldest received slot to producer."""
+        self._free.release()
+
+    def unlink(self):
+        """Releases views of shared ring, should be called when process
+        finished using channel."""
+        if self._shm is not None:
+            self._data.release()
+            self._lengths.release()
@@ -2,20 +2,168 @@
 try:
     import pyb
 except ImportError:
-    class FakePyb(object):
-        def __getattr__(self, item):
-            return self
+    from microasync import fake_pyb as pyb
 
-        def __call__(self, *args, **kwargs):
-            return self
+from time import time
+from microasync.async import coroutine, SlidingChannel, Delay,\
+    ChannelProducer, Channel, ThreadSafeChannel, as_chan
+
+_NOTHING = object()
+_MAX_BACKOFF = 32
+_BACKOFF_PERIOD = 0.01
+_SWITCH_DEBOUNCE = 20
+
+
+def _changed(old, new, deadband):
+    """Checks that reading differs from previous by more than `deadband`,
+    readings like accel's (x, y, z) compared by components."""
+    if old is _NOTHING:
+        return True
+    if isinstance(new, tuple):
+        for old_item, new_item in zip(old, new):
+            if abs(new_item - old_item) > deadband:
+                return True
+        return False
+    return abs(new - old) > deadband
+
+
+class _Sampler(object):
+    """Reads device and puts meaningful readings in channel. Backs off
+    exponentially while nobody waits for readings. Internal use only!"""
+
+    def __init__(self, chan, read, period, deadband=None, debounce=None):
+        """
+        :param read: Function which reads device.
+        :param period: Sampling period in seconds.
+        :type period: float
+        :param deadband: Reading put only when it differs from the last put
+                         by more than deadband, `0` for change-only channel,
+                         every reading put when it's `None`.
+        :type deadband: float
+        :param debounce: Reading put only when it stays the same for
+                         `debounce` seconds.
+        :type debounce: float
+
+        """
+        self.chan = chan
+        self._read = read
+        self._period = period
+        self._deadband = deadband
+        self._debounce = debounce
+        self._last = self._pending = _NOTHING
+        self._since = 0
+        self.backoff = 1
+        self.due = 0
+
+    def poll(self, now):
+        """Samples device when the previous reading was consumed and
+        schedules next poll. Polling backs off while nobody waits for
+        reading or reading isn't put, e.g. unchanged reading of channel
+        with deadband."""
+        waiting = self._has_getter()
+        if not len(self.chan.buffer) and self._sample(now) and waiting:
+            self.backoff = 1
+            self.due = now + self._period
+        else:
+            self.backoff = min(self.backoff * 2, _MAX_BACKOFF)
+            self.due = now + max(self._period, _BACKOFF_PERIOD) * self.backoff
+
+    def _has_getter(self):
+        for prom in self.chan._get_queue:
+            if not prom.delivered:
+                return True
+        return False
+
+    def _sample(self, now):
+        """Reads device, returns `True` when reading put in channel."""
+        val = self._read()
+        if self._debounce is not None:
+            if self._pending is _NOTHING or val != self._pending:
+                self._pending = val
+                self._since = now
+            if now - self._since < self._debounce:
+                return False
+        if self._deadband is None or _changed(self._last, val,
+                                              self._deadband):
+            self._last = val
+            self.chan.put(val)
+            return True
+        return False
+
+
+class _Poller(object):
+    """Polls all samplers with the same period in one coroutine, so they
+    share a single timer. Internal use only!"""
+
+    def __init__(self, period):
+        self._period = period
+        self._samplers = []
+
+    def add(self, sampler):
+        self._samplers.append(sampler)
+        if len(self._samplers) == 1:
+            coroutine(self._run)()
+
+    def _run(self):
+        delay = Delay(self._period)
+        while self._samplers:
+            now = time()
+            wake = None
+            for sampler in list(self._samplers):
+                if sampler.chan.closed:
+                    self._samplers.remove(sampler)
+                    continue
+                if sampler.due <= now:
+                    sampler.poll(now)
+                if wake is None or sampler.due < wake:
+                    wake = sampler.due
+            if wake is None:
+                break
+            elif wake == now + self._period:
+                yield delay.get()
+            else:
+                yield Delay(max(0, wake - time()))
+        del _pollers[self._period]
+
+
+_pollers = {}
+
+
+def _poll(chan, read, rate=None, deadband=None, debounce=None):
+    """Starts sampling of device in `chan`, devices with the same `rate`
+    polled by the same timer. Device polled on every scheduler pass when
+    `rate` is `None`."""
+    period = 0 if rate is None else 1.0 / rate
+    if period not in _pollers:
+        _pollers[period] = _Poller(period)
+    _pollers[period].add(_Sampler(chan, read, period, deadband, debounce))
+    return chan
+
+
+def _edge_handler(chan, read, debounce=0):
+    """Creates interrupt handler which puts reading of device in `chan`.
+    Handler doesn't allocate memory, so it can be used in hard interrupts.
+
+    :param read: Function which reads device.
+    :param debounce: Edges during `debounce` milliseconds after accepted
+                     one are ignored.
+    :type debounce: int
+
+    """
+    last = [None]
 
-    pyb = FakePyb()  # for generating documentation
+    def handler(line=None):
+        if debounce:
+            if last[0] is not None and \
+                    pyb.elapsed_millis(last[0]) < debounce:
+                return
+            last[0] = pyb.millis()
+        chan.put_threadsafe(read())
 
-from microasync.async import coroutine, SlidingChannel, Delay,\
-    ChannelProducer, Channel, as_chan
-from microasync.utils import Atom
+    return handler
 
-_switch = SlidingChannel()
+
+_switch = ThreadSafeChannel()
 _switch_producer = ChannelProducer(_switch)
 
 
@@ -38,22 +186,9 @@ def get_switch():
     return _switch_producer.get_clone()
 
 
-_switch_atom = Atom(False)
-
-
 def _switch_handler():
     switch = pyb.Switch()
-    switch.callback(lambda: _switch_atom.reset(True))
-
-    @coroutine
-    def aux():
-        """For preventing MemoryError."""
-        while True:
-            if _switch_atom.value:
-                yield _switch.put(True)
-                _switch_atom.reset(False)
-            yield Delay(0)
-    aux()
+    switch.callback(_edge_handler(_switch, switch, _SWITCH_DEBOUNCE))
 
 _switch_handler()
 
@@ -75,7 +210,7 @@ _leds_handler()
 servo_chans = {}
 
 
-def get_servo(num):
+def get_servo(num, rate=None, deadband=None):
     """Creates write and read channels for servo. Should be used
     only in coroutine.
 
@@ -83,18 +218,24 @@ def get_servo(num):
 
     .. code-block:: python
 
-        servo_set, servo_get = get_servo(1)
+        servo_set, servo_get = get_servo(1, deadband=1)
         yield servo_set.put(90)  # set servo to 90 degrees
-        print((yield servo.get()))  # prints current servo degree
+        print((yield servo_get.get()))  # prints servo degree when changed
 
     :param num: Number of servo.
     :type num: int
+    :param rate: Samples of read channel per second.
+    :type rate: float
+    :param deadband: Angle put in read channel only when it changed by
+                     more than deadband, every sample put when `None`.
+    :type deadband: float
     :returns: Write and read channels.
     :rtype: (Channel, SlidingChannel)
 
     """
-    if not num in servo_chans:
-        servo_chans[num] = (Channel(), SlidingChannel())
+    if num in servo_chans:
+        return servo_chans[num]
+    servo_chans[num] = (Channel(), SlidingChannel())
     servo = pyb.Servo(num)
 
     @coroutine
@@ -104,69 +245,108 @@ def get_servo(num):
             servo.angle(val)
     set_aux()
 
-    @coroutine
-    def get_aux():
-        while True:
-            val = servo.angle()
-            yield servo_chans[num][1].put(val)
-            yield Delay(0)
-    get_aux()
+    _poll(servo_chans[num][1], servo.angle, rate, deadband)
     return servo_chans[num]
 
 
-accel = SlidingChannel()
-accel_run = Atom(False)
+accel_chans = {}
 
 
-def get_accel():
-    """Creates channel for on-board accel.
+def get_accel(rate=None, deadband=None):
+    """Creates channel for on-board accel, calls with the same arguments
+    share channel.
 
     Usage:
 
     .. code-block:: python
 
-        accel_chan = get_accel()
+        accel_chan = get_accel(rate=50, deadband=2)
         while True:
-            print((yield accel_chan.get()))  # prints current accel (x, y, z)
+            print((yield accel_chan.get()))  # prints changed accel (x, y, z)
 
+    :param rate: Samples per second.
+    :type rate: float
+    :param deadband: Accel put only when any of axes changed by more than
+                     deadband, every sample put when `None`.
+    :type deadband: float
     :returns: Created channel.
     :rtype: Channel
 
     """
-    @coroutine
-    def aux():
-        dev = pyb.Accel()
-        while True:
-            yield accel.put(dev.filtered_xyz())
-            yield Delay(0)
+    key = (rate, deadband)
+    if key not in accel_chans:
+        accel_chans[key] = _poll(SlidingChannel(), pyb.Accel().filtered_xyz,
+                                 rate, deadband)
+    return accel_chans[key]
 
-    if not accel_run.value:
-        aux()
-    return accel
 
-
-@as_chan(Channel)
-def get_input_pin(chan, pin_name):
-    """Creates channel for input pin.
+def get_input_pin(pin_name, rate=None, deadband=None, debounce=None):
+    """Creates channel for input pin, which samples pin. For reacting on
+    changes use `get_pin_edges`, which doesn't poll.
 
     Usage:
 
     .. code-block:: python
 
-        pin_chan = get_input_pin('X1')
-        yield pin.put(True)  # sets voltage to 3.3V on pin
-        yield pin.put(False)  # sets voltage to 0V on pin
+        pin_chan = get_input_pin('X1', deadband=0, debounce=0.02)
+        while True:
+            print((yield pin_chan.get()))  # prints debounced pin changes
 
     :param pin_name: Name of pin like 'X1'.
+    :param rate: Samples per second.
+    :type rate: float
+    :param deadband: `0` for change-only channel, every sample put when
+                     `None`.
+    :type deadband: float
+    :param debounce: Value put only when pin keeps it for `debounce`
+                     seconds.
+    :type debounce: float
     :returns: Created channel.
     :rtype: Channel
 
     """
 
-    pin = pyb.Pin(pin_name, mode=pyb.Pin.INP)
-    while True:
-        yield chan.put(pin.value())
-        yield Delay(0)
+    pin = pyb.Pin(pin_name, mode=pyb.Pin.IN)
+    return _poll(Channel(), pin.value, rate, deadband, debounce)
+
+
+_pin_ints = {}
+
+
+def get_pin_edges(pin_name, edge=pyb.ExtInt.IRQ_RISING_FALLING,
+                  pull=pyb.Pin.PULL_NONE, debounce=0, ring_size=32):
+    """Creates channel of input pin edges. Edges are delivered by pin
+    interrupt into lock-free ring of channel, so nothing polls the pin.
+
+    Usage:
+
+    .. code-block:: python
+
+        pin_chan = get_pin_edges('X1', edge=pyb.ExtInt.IRQ_RISING,
+                                 pull=pyb.Pin.PULL_DOWN, debounce=20)
+        while True:
+            yield pin_chan.get()
+            print('pressed!')
+
+    :param pin_name: Name of pin like 'X1'.
+    :param edge: `pyb.ExtInt.IRQ_RISING`, `IRQ_FALLING` or
+                 `IRQ_RISING_FALLING`.
+    :param pull: Pull resistor of pin.
+    :param debounce: Edges during `debounce` milliseconds after accepted
+                     one are ignored.
+    :type debounce: int
+    :param ring_size: Count of edges which can wait for scheduler, the
+                      rest are counted in `dropped` of channel.
+    :type ring_size: int
+    :returns: Channel of pin values after edges.
+    :rtype: ThreadSafeChannel
+
+    """
+    chan = ThreadSafeChannel(ring_size=ring_size)
+    pin = pyb.Pin(pin_name, pyb.Pin.IN, pull)
+    _pin_ints[pin_name] = pyb.ExtInt(
+        pin, edge, pull, _edge_handler(chan, pin.value, debounce))
+    return chan
 
 
 @as_chan(SlidingChannel)
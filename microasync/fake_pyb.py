@@ -0,0 +1,161 @@
+"""Stand-in for `pyb` module, used by `microasync.device` when it runs not
+on pyboard, e.g. for testing or generating documentation on Linux.
+
+Hardware is emulated in memory, interrupts are called synchronously.
+
+Usage:
+
+.. code-block:: python
+
+    from microasync import fake_pyb
+
+    fake_pyb.Pin('X1').drive(1)  # rising edge on pin, calls `ExtInt`
+    fake_pyb.Switch().press()  # calls switch callback
+
+"""
+from time import time
+
+_start = time()
+_levels = {}
+_ext_ints = {}
+
+
+def millis():
+    """Returns milliseconds since start."""
+    return int((time() - _start) * 1000)
+
+
+def elapsed_millis(start):
+    """Returns milliseconds passed since `start`."""
+    return millis() - start
+
+
+class Pin(object):
+    """Pin with level shared between all instances with the same name."""
+    IN = 0
+    OUT_PP = 1
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, name, mode=IN, pull=PULL_NONE):
+        self._name = name
+        if name not in _levels:
+            _levels[name] = 1 if pull == Pin.PULL_UP else 0
+
+    def name(self):
+        return self._name
+
+    def value(self, val=None):
+        if val is None:
+            return _levels[self._name]
+        self.drive(val)
+
+    def drive(self, val):
+        """Changes level of pin and calls interrupt handlers which match
+        the edge."""
+        val = 1 if val else 0
+        old = _levels[self._name]
+        _levels[self._name] = val
+        if old == val:
+            return
+        edge = ExtInt.IRQ_RISING if val else ExtInt.IRQ_FALLING
+        for ext_int in list(_ext_ints.get(self._name, ())):
+            if ext_int._enabled and ext_int._mode & edge:
+                ext_int._callback(ext_int.line())
+
+
+class ExtInt(object):
+    """External interrupt on pin edges."""
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    IRQ_RISING_FALLING = 3
+
+    def __init__(self, pin, mode, pull, callback):
+        if not isinstance(pin, Pin):
+            pin = Pin(pin, Pin.IN, pull)
+        self._pin = pin
+        self._mode = mode
+        self._callback = callback
+        self._enabled = True
+        self._line = sum(len(exts) for exts in _ext_ints.values())
+        _ext_ints.setdefault(pin.name(), []).append(self)
+
+    def line(self):
+        return self._line
+
+    def enable(self):
+        self._enabled = True
+
+    def disable(self):
+        self._enabled = False
+
+
+class Switch(object):
+    """Onboard switch, all instances share state."""
+    _pressed = False
+    _callback = None
+
+    def __call__(self):
+        return Switch._pressed
+
+    def callback(self, fn):
+        Switch._callback = fn
+
+    def press(self):
+        Switch._pressed = True
+        if Switch._callback is not None:
+            Switch._callback()
+
+    def release(self):
+        Switch._pressed = False
+
+
+class LED(object):
+
+    def __init__(self, num):
+        self._num = num
+        _levels.setdefault(('led', num), 0)
+
+    def on(self):
+        _levels[('led', self._num)] = 1
+
+    def off(self):
+        _levels[('led', self._num)] = 0
+
+    def toggle(self):
+        _levels[('led', self._num)] ^= 1
+
+    def intensity(self, val=None):
+        if val is None:
+            return _levels[('led', self._num)]
+        _levels[('led', self._num)] = val
+
+
+class Servo(object):
+
+    def __init__(self, num):
+        self._num = num
+        _levels.setdefault(('servo', num), 0)
+
+    def angle(self, val=None):
+        if val is None:
+            return _levels[('servo', self._num)]
+        _levels[('servo', self._num)] = val
+
+
+class Accel(object):
+    """Accelerometer, `xyz` can be changed for emulating movement."""
+    xyz = (0, 0, 0)
+
+    def x(self):
+        return Accel.xyz[0]
+
+    def y(self):
+        return Accel.xyz[1]
+
+    def z(self):
+        return Accel.xyz[2]
+
+    def filtered_xyz(self):
+        return Accel.xyz
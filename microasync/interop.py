@@ -0,0 +1,157 @@
+"""Interoperability with asyncio, CPython only.
+
+Usage:
+
+.. code-block:: python
+
+    import asyncio
+    from microasync.interop import attach, to_future
+
+    chan = Channel()
+    attach()  # microasync coroutines now driven by asyncio loop
+
+    async def consumer():
+        print(await to_future(chan.get()))
+
+    asyncio.get_event_loop().run_until_complete(consumer())
+
+"""
+import asyncio
+from microasync.utils import Promise
+from microasync.async import process_all, next_timeout, set_wakeup,\
+    Waiter, get_waiter, set_waiter, Cancelled
+
+
+class AsyncioDriver(Waiter):
+    """Drives microasync scheduler from asyncio event loop, so single
+    loop used for both of them."""
+
+    def __init__(self, loop):
+        """
+        :param loop: Asyncio event loop.
+        :type loop: asyncio.AbstractEventLoop
+
+        """
+        self._loop = loop
+        self._handle = None
+        self._step_pending = False
+        self._prev_waiter = None
+
+    def start(self):
+        """Starts driving scheduler."""
+        self._prev_waiter = get_waiter()
+        set_waiter(self)
+        set_wakeup(self._wakeup)
+        self._wakeup()
+
+    def stop(self):
+        """Stops driving scheduler."""
+        set_wakeup(None)
+        set_waiter(self._prev_waiter)
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def notify(self):
+        """Wakes up driver from other thread."""
+        self._loop.call_soon_threadsafe(self._wakeup)
+
+    def add_reader(self, fd, callback):
+        """Calls `callback` when `fd` is ready for reading, used by
+        `microasync.io`."""
+        self._loop.add_reader(fd, callback)
+
+    def remove_reader(self, fd):
+        self._loop.remove_reader(fd)
+
+    def add_writer(self, fd, callback):
+        """Calls `callback` when `fd` is ready for writing, used by
+        `microasync.io`."""
+        self._loop.add_writer(fd, callback)
+
+    def remove_writer(self, fd):
+        self._loop.remove_writer(fd)
+
+    def _wakeup(self):
+        if not self._step_pending:
+            self._step_pending = True
+            self._loop.call_soon(self._step)
+
+    def _step(self):
+        """Processes ready items and waits for nearest timer."""
+        self._step_pending = False
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        process_all()
+        timeout = next_timeout()
+        if timeout == 0:
+            self._wakeup()
+        elif timeout is not None:
+            self._handle = self._loop.call_later(timeout, self._step)
+
+
+def attach(loop=None):
+    """Starts driving microasync scheduler from asyncio event loop, should
+    be used instead of `microasync.async.loop`.
+
+    :param loop: Asyncio event loop, current by default.
+    :type loop: asyncio.AbstractEventLoop
+    :returns: Started driver.
+    :rtype: AsyncioDriver
+
+    """
+    driver = AsyncioDriver(loop or asyncio.get_event_loop())
+    driver.start()
+    return driver
+
+
+def to_future(promise, loop=None):
+    """Creates asyncio future which resolves when promise delivered, allows
+    asyncio tasks to await channels operations.
+
+    :param promise: Microasync promise.
+    :type promise: Promise
+    :param loop: Asyncio event loop, current by default.
+    :type loop: asyncio.AbstractEventLoop
+    :rtype: asyncio.Future
+
+    """
+    future = (loop or asyncio.get_event_loop()).create_future()
+
+    def callback(prom):
+        if future.done():
+            return
+        if prom.error is None:
+            future.set_result(prom.value)
+        else:
+            future.set_exception(prom.error)
+
+    promise.on_delivery(callback)
+    return future
+
+
+def from_future(future, loop=None):
+    """Creates promise which delivered when asyncio future or coroutine
+    finishes, allows microasync coroutines to await asyncio code. Errors
+    of future raised in awaiting coroutine, cancellation of future raised
+    as `Cancelled`.
+
+    :param future: Asyncio future or coroutine.
+    :param loop: Asyncio event loop, current by default.
+    :type loop: asyncio.AbstractEventLoop
+    :rtype: Promise
+
+    """
+    promise = Promise()
+
+    def callback(fut):
+        if fut.cancelled():
+            promise.reject(Cancelled())
+        elif fut.exception() is not None:
+            promise.reject(fut.exception())
+        else:
+            promise.delivery(fut.result())
+
+    asyncio.ensure_future(future, loop=loop).add_done_callback(callback)
+    return promise
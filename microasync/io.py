@@ -0,0 +1,401 @@
+"""Non-blocking sockets and pipes as channels, CPython only.
+
+Readiness of file descriptors is checked by `SelectorWaiter`, which
+replaces waiter of main loop, so loop blocks in `select` until I/O is
+ready, the nearest timer is due or it's notified from other thread.
+When scheduler driven by asyncio, its event loop used instead.
+
+Usage:
+
+.. code-block:: python
+
+    from microasync.io import tcp_server
+
+    @coroutine
+    def echo(reader, writer):
+        while True:
+            data = yield reader.get()
+            if data is None:
+                break
+            yield writer.put(data)
+        writer.close()
+
+    @coroutine
+    def main():
+        server = tcp_server('127.0.0.1', 8000)
+        while True:
+            reader, writer = yield server.get()
+            echo(reader, writer)
+
+    main()
+    loop()
+
+"""
+import errno
+import os
+import selectors
+import socket
+from microasync.utils import Promise
+from microasync.async import Waiter, Channel, coroutine, get_waiter,\
+    set_waiter, do_all
+
+
+class SelectorWaiter(Waiter):
+    """Waiter which blocks in selector, can be woken up from other threads
+    through self-pipe."""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self._wake_write, False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+
+    def wait(self, timeout):
+        for key, events in self._selector.select(timeout):
+            if key.data is None:
+                self._drain()
+                continue
+            if events & selectors.EVENT_READ and key.data[0]:
+                key.data[0]()
+            if events & selectors.EVENT_WRITE and key.data[1]:
+                key.data[1]()
+
+    def poll(self):
+        self.wait(0)
+
+    def notify(self):
+        try:
+            os.write(self._wake_write, b'\0')
+        except BlockingIOError:
+            pass  # loop already notified
+
+    def add_reader(self, fd, callback):
+        """Calls `callback` when `fd` is ready for reading, until reader
+        removed."""
+        self._update(fd, 0, callback)
+
+    def remove_reader(self, fd):
+        self._update(fd, 0, None)
+
+    def add_writer(self, fd, callback):
+        """Calls `callback` when `fd` is ready for writing, until writer
+        removed."""
+        self._update(fd, 1, callback)
+
+    def remove_writer(self, fd):
+        self._update(fd, 1, None)
+
+    def _update(self, fd, index, callback):
+        """Sets reader or writer of `fd`, registration of `fd` changed
+        according to remaining callbacks."""
+        try:
+            key = self._selector.get_key(fd)
+        except KeyError:
+            key = None
+        callbacks = [None, None] if key is None else key.data
+        callbacks[index] = callback
+        events = (selectors.EVENT_READ if callbacks[0] else 0) |\
+            (selectors.EVENT_WRITE if callbacks[1] else 0)
+        if key is None:
+            if events:
+                self._selector.register(fd, events, callbacks)
+        elif events:
+            self._selector.modify(fd, events, callbacks)
+        else:
+            self._selector.unregister(fd)
+
+    def _drain(self):
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def get_io_waiter():
+    """Returns waiter which checks readiness of file descriptors, installs
+    `SelectorWaiter` when current waiter can't do it."""
+    waiter = get_waiter()
+    if not hasattr(waiter, 'add_reader'):
+        waiter = SelectorWaiter()
+        set_waiter(waiter)
+    return waiter
+
+
+def _fileno(fd):
+    return fd if isinstance(fd, int) else fd.fileno()
+
+
+def _when_ready(fd, add, remove):
+    promise = Promise()
+    waiter = get_io_waiter()
+
+    def ready():
+        getattr(waiter, remove)(fd)
+        promise.delivery(True)
+
+    getattr(waiter, add)(fd, ready)
+    return promise
+
+
+def readable(fd):
+    """Waits until `fd` is ready for reading.
+
+    :param fd: File descriptor or object with `fileno`.
+    :returns: Promise delivered with `True`.
+    :rtype: Promise
+
+    """
+    return _when_ready(_fileno(fd), 'add_reader', 'remove_reader')
+
+
+def writable(fd):
+    """Waits until `fd` is ready for writing.
+
+    :param fd: File descriptor or object with `fileno`.
+    :returns: Promise delivered with `True`.
+    :rtype: Promise
+
+    """
+    return _when_ready(_fileno(fd), 'add_writer', 'remove_writer')
+
+
+def _forget(fd):
+    """Removes `fd` from waiter before closing it."""
+    waiter = get_io_waiter()
+    waiter.remove_reader(fd)
+    waiter.remove_writer(fd)
+
+
+@coroutine
+def _reader(fd, chan, size):
+    """Reads chunks from `fd` until end of file or closing of `chan`, waits
+    for readiness only when nothing can be read immediately."""
+    fileno = _fileno(fd)
+    while True:
+        try:
+            data = os.read(fileno, size)
+        except BlockingIOError:
+            yield readable(fileno)
+            continue
+        except OSError:
+            data = b''
+        if not data or not (yield chan.put(data)):
+            break
+    chan.close()
+
+
+@coroutine
+def _writer(fd, chan):
+    """Writes chunks from `chan` to `fd` until channel closed, waits for
+    readiness only when `fd` can't accept data."""
+    fileno = _fileno(fd)
+    while True:
+        data = yield chan.get()
+        if data is None and chan.closed:
+            break
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(fileno, view):]
+            except BlockingIOError:
+                yield writable(fileno)
+            except OSError:
+                chan.close()
+                return
+
+
+def read_chan(fd, size=4096, limit=1):
+    """Creates channel of chunks read from file descriptor, channel closed
+    on end of file. Descriptor switched to non-blocking mode and isn't
+    closed by channel.
+
+    Usage:
+
+    .. code-block:: python
+
+        stdin = read_chan(0)
+        while True:
+            print((yield stdin.get()))
+
+    :param fd: File descriptor or object with `fileno`.
+    :param size: Max size of chunk in bytes.
+    :type size: int
+    :param limit: Count of chunks which can be read ahead.
+    :type limit: int
+    :returns: Channel of bytes.
+    :rtype: Channel
+
+    """
+    os.set_blocking(_fileno(fd), False)
+    chan = Channel(limit)
+    _reader(fd, chan, size)
+    return chan
+
+
+def write_chan(fd, limit=1):
+    """Creates channel which writes bytes to file descriptor, writing stops
+    when channel closed. Descriptor switched to non-blocking mode and isn't
+    closed by channel.
+
+    Usage:
+
+    .. code-block:: python
+
+        stdout = write_chan(1)
+        yield stdout.put(b'hello')
+
+    :param fd: File descriptor or object with `fileno`.
+    :param limit: Count of chunks waiting for writing.
+    :type limit: int
+    :returns: Channel for bytes.
+    :rtype: Channel
+
+    """
+    os.set_blocking(_fileno(fd), False)
+    chan = Channel(limit)
+    _writer(fd, chan)
+    return chan
+
+
+def _connection(sock, size):
+    """Creates reader and writer of connected socket. Closing of writer
+    shuts down sending side, socket closed when peer closed connection
+    too."""
+    sock.setblocking(False)
+    reader = Channel()
+    writer = Channel()
+
+    def written(_):
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def finished(_):
+        _forget(sock.fileno())
+        sock.close()
+
+    writing = _writer(sock, writer)
+    writing.on_delivery(written)
+    do_all(_reader(sock, reader, size), writing).on_delivery(finished)
+    return reader, writer
+
+
+def tcp_connect(host, port, size=4096):
+    """Connects to TCP server.
+
+    Usage:
+
+    .. code-block:: python
+
+        reader, writer = yield tcp_connect('127.0.0.1', 8000)
+        yield writer.put(b'ping')
+        print((yield reader.get()))
+        writer.close()
+
+    :param host: Address of server.
+    :type host: str
+    :param port: Port of server.
+    :type port: int
+    :param size: Max size of received chunks in bytes.
+    :type size: int
+    :returns: Promise delivered with reader and writer channels, or with
+              `None` when connection failed.
+    :rtype: Promise
+
+    """
+    @coroutine
+    def aux():
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        error = sock.connect_ex((host, port))
+        if error in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            yield writable(sock)
+            error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            sock.close()
+            return None
+        return _connection(sock, size)
+
+    return aux()
+
+
+class Server(Channel):
+    """Channel of connections accepted by TCP server, closing of channel
+    stops server."""
+    __slots__ = ('_sock', '_waiting', 'address')
+
+    def __init__(self, sock, limit=1):
+        """
+        :param sock: Listening socket.
+        :type sock: socket.socket
+        :param limit: Count of accepted connections waiting for consumer.
+        :type limit: int
+
+        """
+        super(Server, self).__init__(limit)
+        self._sock = sock
+        self._waiting = None
+        self.address = sock.getsockname()
+
+    def close(self):
+        """Closes listening socket, accepting coroutine waiting for
+        readiness of socket is woken up, so it exits."""
+        if not self.closed:
+            _forget(self._sock.fileno())
+            self._sock.close()
+        super(Server, self).close()
+        waiting, self._waiting = self._waiting, None
+        if waiting is not None:
+            waiting.delivery(False)
+
+
+def tcp_server(host, port, backlog=128, size=4096, limit=1):
+    """Starts TCP server, `port` can be `0` for choosing free port, it's
+    available in `address` of result.
+
+    :param host: Address for listening.
+    :type host: str
+    :param port: Port for listening.
+    :type port: int
+    :param backlog: Backlog of listening socket.
+    :type backlog: int
+    :param size: Max size of received chunks in bytes.
+    :type size: int
+    :param limit: Count of accepted connections waiting for consumer.
+    :type limit: int
+    :returns: Channel of reader and writer pairs of connections.
+    :rtype: Server
+
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    server = Server(sock, limit)
+
+    @coroutine
+    def aux():
+        while not server.closed:
+            try:
+                conn, _ = sock.accept()
+            except BlockingIOError:
+                server._waiting = readable(sock)
+                yield server._waiting
+                server._waiting = None
+                continue
+            except OSError:
+                break
+            reader, writer = _connection(conn, size)
+            if not (yield server.put((reader, writer))):
+                writer.close()
+                reader.close()
+        server.close()
+
+    aux()
+    return server
@@ -0,0 +1,191 @@
+"""Pool of reusable resources like connections.
+
+Usage:
+
+.. code-block:: python
+
+    from microasync.io import tcp_connect
+    from microasync.pool import Pool
+
+    pool = Pool(lambda: tcp_connect('127.0.0.1', 6379), max_size=4,
+                idle_timeout=30, check=lambda conn: not conn[0].closed,
+                close=lambda conn: conn[1].close())
+
+    @coroutine
+    def request(data):
+        conn = yield pool.acquire()
+        reader, writer = conn
+        yield writer.put(data)
+        response = yield reader.get()
+        pool.release(conn)
+        return response
+
+"""
+from collections import deque
+from time import time
+from microasync.utils import Promise, WithEquality
+from microasync.async import Delay, coroutine, _Expiring, _Operation
+
+
+class Pool(WithEquality):
+    """Bounded pool of resources. Coroutines waiting for resource served
+    in order of `acquire` calls, released resource handed to the oldest
+    waiter directly. The most recently released resources reused first,
+    so rarely needed resources stay idle and get evicted."""
+
+    def __init__(self, factory, max_size=4, idle_timeout=None, check=None,
+                 close=None):
+        """
+        :param factory: Function which creates resource, can return
+                        promise delivered with resource or with `None`
+                        on failure.
+        :param max_size: Max count of created resources.
+        :type max_size: int
+        :param idle_timeout: Resources idle for longer than `idle_timeout`
+                             seconds are closed.
+        :type idle_timeout: float
+        :param check: Function which checks health of idle resource
+                      before handing it out, unhealthy resource closed.
+        :param close: Function which closes resource.
+
+        """
+        super(Pool, self).__init__()
+        self._factory = factory
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._check = check
+        self._close = close
+        self._idle = []
+        self._waiters = deque()
+        self._sweeping = False
+        self.size = 0
+        self.closed = False
+
+    @property
+    def idle(self):
+        """Count of idle resources."""
+        return len(self._idle)
+
+    def acquire(self, timeout=None):
+        """Takes resource from pool, creates new one when there's no idle
+        resources and pool isn't full.
+
+        :param timeout: Timeout in seconds, after which promise delivered
+                        with `None`.
+        :type timeout: float
+        :returns: Promise delivered with resource, or with `None` when pool
+                  closed or resource can't be created, rejected with error
+                  of factory.
+        :rtype: Promise
+
+        """
+        prom = _Operation() if timeout is None else _Expiring(timeout, None)
+        if self.closed:
+            prom.delivery(None)
+        else:
+            self._waiters.append(prom)
+            self._serve()
+        return prom
+
+    def release(self, resource):
+        """Returns resource to pool.
+
+        :param resource: Resource received from `acquire`.
+
+        """
+        if self.closed:
+            self._dispose(resource)
+            return
+        while self._waiters:
+            if self._waiters.popleft().delivery(resource):
+                return
+        self._idle.append((resource, time()))
+        if self._idle_timeout is not None and not self._sweeping:
+            self._sweeping = True
+            self._sweep()
+
+    def discard(self, resource):
+        """Closes broken resource instead of returning it to pool, frees
+        place for new one.
+
+        :param resource: Resource received from `acquire`.
+
+        """
+        self._dispose(resource)
+        self._serve()
+
+    def close(self):
+        """Closes idle resources, pending and future `acquire` receive
+        `None`, acquired resources closed on release."""
+        self.closed = True
+        while self._idle:
+            self._dispose(self._idle.pop()[0])
+        while self._waiters:
+            self._waiters.popleft().delivery(None)
+
+    def _serve(self):
+        """Hands idle or new resources to waiters while possible."""
+        while self._waiters:
+            if self._waiters[0].delivered:
+                self._waiters.popleft()
+            elif self._idle:
+                resource = self._idle.pop()[0]
+                if self._check is None or self._check(resource):
+                    self.release(resource)
+                else:
+                    self._dispose(resource)
+            elif self.size < self._max_size:
+                self.size += 1
+                self._create(self._waiters.popleft())
+            else:
+                break
+
+    def _create(self, prom):
+        """Creates resource for waiter, resource returned to pool when
+        waiter gone before it's created."""
+        try:
+            resource = self._factory()
+        except Exception as e:
+            self._created(prom, None, e)
+            return
+        if isinstance(resource, Promise):
+            resource.on_delivery(
+                lambda res: self._created(prom, res.value, res.error))
+        else:
+            self._created(prom, resource)
+
+    def _created(self, prom, resource, error=None):
+        if resource is None:
+            self.size -= 1
+            if error is None:
+                prom.delivery(None)
+            else:
+                prom.reject(error)
+            self._serve()
+        elif not prom.delivery(resource):
+            self.release(resource)
+
+    def _dispose(self, resource):
+        self.size -= 1
+        if self._close is not None:
+            self._close(resource)
+
+    def _evict(self):
+        """Closes resources which are idle for too long, the oldest
+        resources are in the start of idle list."""
+        deadline = time() - self._idle_timeout
+        count = 0
+        while count < len(self._idle) and self._idle[count][1] <= deadline:
+            count += 1
+        for resource, _ in self._idle[:count]:
+            self._dispose(resource)
+        del self._idle[:count]
+
+    @coroutine
+    def _sweep(self):
+        """Evicts idle resources while there're any of them."""
+        while self._idle and not self.closed:
+            expires = self._idle[0][1] + self._idle_timeout
+            yield Delay(max(0, expires - time()))
+            self._evict()
+        self._sweeping = False
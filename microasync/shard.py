@@ -0,0 +1,235 @@
+"""Sharded runtime which runs coroutines in many processes, CPython only.
+
+Usage:
+
+.. code-block:: python
+
+    def square(inp, out):
+        while True:
+            val = yield inp.get()
+            if val is None:
+                break
+            yield out.put(val * val)
+
+    inp = ProcessChannel()
+    out = ProcessChannel()
+    runtime = ShardedRuntime(workers=4)
+    for _ in range(4):
+        runtime.spawn(square, inp, out)
+    runtime.start()
+
+"""
+import multiprocessing
+from queue import Empty, Full
+from microasync.utils import Promise, WithEquality
+from microasync.async import coroutine, run_until, reset, do_all
+from microasync.threads import ThreadPool, set_default_pool,\
+    install_waiter
+
+
+class _Closed(object):
+    """Marker of closed process channel."""
+
+
+class ProcessChannel(WithEquality):
+    """Channel shared between processes, with the same api as `Channel`.
+    Should be created before starting of `ShardedRuntime` and passed to
+    coroutines as arguments.
+
+    Items are pickled, when channel is empty or full, `get` or `put` waits
+    in own reader or writer thread of channel, so waiting doesn't occupy
+    default thread pool.
+
+    """
+
+    def __init__(self, limit=1, context=None):
+        """
+        :param limit: Limit of objects in channel.
+        :type limit: int
+        :param context: Multiprocessing context.
+
+        """
+        super(ProcessChannel, self).__init__()
+        self._queue = (context or multiprocessing).Queue(limit)
+        self._reader = None
+        self._writer = None
+        self.closed = False
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_reader'] = state['_writer'] = None
+        return state
+
+    def __setstate__(self, state):
+        # id isn't shared, counter of other process can give it to others:
+        super(ProcessChannel, self).__init__()
+        self.__dict__.update(state)
+
+    def get(self):
+        """Get item from channel.
+
+        :returns: Promise for getting item from channel.
+        :rtype: Promise
+
+        """
+        if self.closed:
+            return self._delivered(None)
+        try:
+            return self._delivered(self._received(self._queue.get_nowait()))
+        except Empty:
+            promise = Promise()
+            if self._reader is None:
+                self._reader = ThreadPool(1)
+            self._reader.submit(self._queue.get).on_delivery(
+                lambda prom: self._pass_received(prom, promise))
+            return promise
+
+    def put(self, val):
+        """Put item in channel.
+
+        :returns: Promise for putting item in channel.
+        :rtype: Promise
+
+        """
+        if self.closed:
+            return self._delivered(False)
+        try:
+            self._queue.put_nowait(val)
+            return self._delivered(True)
+        except Full:
+            return self._write(self._put_blocking, val)
+
+    def close(self):
+        """Closes channel in all processes."""
+        if not self.closed:
+            self.closed = True
+            self._pass_closed()
+
+    def _write(self, fn, *args):
+        if self._writer is None:
+            self._writer = ThreadPool(1)
+        return self._writer.submit(fn, *args)
+
+    def _stop_threads(self):
+        """Threads exit after finishing pending calls."""
+        for pool in (self._reader, self._writer):
+            if pool is not None:
+                pool.shutdown()
+        self._reader = self._writer = None
+
+    def _pass_closed(self):
+        """Puts closing marker for other processes, waits in writer thread
+        when queue is full, so loop isn't blocked."""
+        try:
+            self._queue.put_nowait(_Closed)
+        except Full:
+            self._write(self._queue.put, _Closed)
+        self._stop_threads()
+
+    def _put_blocking(self, val):
+        self._queue.put(val)
+        return True
+
+    def _received(self, val):
+        """Handles closing, marker passed further for other processes."""
+        if val is _Closed:
+            self.closed = True
+            self._pass_closed()
+            return None
+        return val
+
+    def _pass_received(self, prom, promise):
+        if prom.error is None:
+            promise.delivery(self._received(prom.value))
+        else:
+            promise.reject(prom.error)
+
+    def _delivered(self, val):
+        promise = Promise()
+        promise.delivery(val)
+        return promise
+
+
+def _worker_main(jobs):
+    """Entry point of worker process, runs coroutines until all of them
+    finished. Error of any coroutine raised, so worker exits with non-zero
+    code."""
+    reset()
+    install_waiter()
+    set_default_pool(ThreadPool())
+    blocks = [coroutine(fn)(*args, **kwargs) for fn, args, kwargs in jobs]
+    run_until(do_all(*blocks))
+
+
+class ShardedRuntime(object):
+    """Runs coroutines in `workers` processes, each process has own
+    scheduler. Coroutines distributed with round-robin or by affinity.
+
+    Coroutines should be passed as not decorated generator functions
+    defined on module level, communication between processes should be
+    done with `ProcessChannel`.
+
+    """
+
+    def __init__(self, workers=None, context=None):
+        """
+        :param workers: Count of processes, count of cpus by default.
+        :type workers: int
+        :param context: Multiprocessing context.
+
+        """
+        self._context = context or multiprocessing
+        self._workers = workers or multiprocessing.cpu_count()
+        self._jobs = [[] for _ in range(self._workers)]
+        self._next = 0
+        self._processes = []
+
+    def spawn(self, fn, *args, **kwargs):
+        """Places coroutine on worker. Should be called before `start`.
+
+        :param fn: Generator function.
+        :param affinity: Coroutines with equal affinity placed on the same
+                         worker, round-robin used when it's `None`.
+        :returns: Number of worker.
+        :rtype: int
+
+        """
+        affinity = kwargs.pop('affinity', None)
+        if self._processes:
+            raise RuntimeError('Runtime already started')
+        if affinity is None:
+            worker = self._next
+            self._next = (self._next + 1) % self._workers
+        else:
+            worker = hash(affinity) % self._workers
+        self._jobs[worker].append((fn, args, kwargs))
+        return worker
+
+    def start(self):
+        """Starts worker processes."""
+        for jobs in self._jobs:
+            if jobs:
+                process = self._context.Process(target=_worker_main,
+                                                args=(jobs,))
+                process.daemon = True
+                process.start()
+                self._processes.append(process)
+
+    def join(self):
+        """Returns promise delivered with exit codes when all workers
+        finished, waits in own thread."""
+        pool = ThreadPool(1)
+        promise = pool.submit(self._join)
+        pool.shutdown()
+        return promise
+
+    def stop(self):
+        """Terminates all workers."""
+        for process in self._processes:
+            process.terminate()
+        self._join()
+
+    def _join(self):
+        for process in self._processes:
+            process.join()
+        return [process.exitcode for process in self._processes]
@@ -0,0 +1,349 @@
+"""Stream combinators over channels.
+
+Stateless stages (`map` and `filter`) are fused: they return `Stream`,
+channel-like view of source which applies all stages on `get`, so a
+chain of stateless stages costs no extra coroutines and channel hops.
+Stateful combinators start single coroutine and return new channel.
+
+Usage:
+
+.. code-block:: python
+
+    from microasync import streams
+
+    readings = streams.map(lambda xyz: xyz[0], get_accel())
+    positive = streams.filter(lambda x: x > 0, readings)
+    batches = streams.batch(10, positive, timeout=1)
+    while True:
+        print((yield batches.get()))
+
+"""
+from collections import deque
+from time import time
+from microasync.utils import WithEquality
+from microasync.async import Channel, coroutine, alts, _Expiring, _Operation
+
+_MAP = 0
+_FILTER = 1
+_SKIP = object()
+
+
+class _StageHandle(object):
+    """Getter which registered in source channel and applies stages of
+    stream before delivering value to target. Internal use only!"""
+    __slots__ = ('_stream', '_target')
+
+    def __init__(self, stream, target):
+        self._stream = stream
+        self._target = target
+
+    @property
+    def delivered(self):
+        return self._target.delivered
+
+    def delivery(self, value):
+        stream = self._stream
+        if value is None and stream.closed:
+            return self._target.delivery(None)
+        try:
+            value = stream._apply(value)
+        except Exception as e:
+            return self._target.reject(e)
+        if value is _SKIP:
+            stream._wait(self, False)
+            return False
+        else:
+            return self._target.delivery(value)
+
+    def _deliver_from(self, promise):
+        if promise.error is None:
+            self.delivery(promise.value)
+        else:
+            self._target.reject(promise.error)
+
+
+class Stream(WithEquality):
+    """Channel-like view of source channel with fused stateless stages,
+    supports `get` and can be used in `alts`."""
+    __slots__ = ('_source', '_stages')
+
+    def __init__(self, source, stages=()):
+        """
+        :param source: Source channel.
+        :type source: Channel
+        :param stages: Pairs of stage kind and function.
+        :type stages: tuple
+
+        """
+        super(Stream, self).__init__()
+        self._source = source
+        self._stages = stages
+
+    @property
+    def closed(self):
+        return self._source.closed
+
+    def with_stage(self, kind, fn):
+        """Returns new stream with additional stage."""
+        return Stream(self._source, self._stages + ((kind, fn),))
+
+    def get(self, timeout=None):
+        """Get item from stream.
+
+        :param timeout: Timeout in seconds, after which promise delivered
+                        with `None`.
+        :type timeout: float
+        :returns: Promise for getting item.
+        :rtype: Promise
+
+        """
+        prom = _Operation() if timeout is None else _Expiring(timeout, None)
+        self._add_getter(prom)
+        return prom
+
+    def _add_getter(self, target):
+        self._wait(_StageHandle(self, target), True)
+
+    def _wait(self, handle, process):
+        """Waits for item from source. Handle of skipped item returns to
+        queue of source channel without processing, channel delivers next
+        item to it in the same loop, so skipped items don't grow stack."""
+        if isinstance(self._source, Channel):
+            self._source._add_getter(handle, process)
+        else:
+            self._source.get().on_delivery(handle._deliver_from)
+
+    def _apply(self, value):
+        for kind, fn in self._stages:
+            if kind == _MAP:
+                value = fn(value)
+            elif not fn(value):
+                return _SKIP
+        return value
+
+
+def _stream(chan):
+    return chan if isinstance(chan, Stream) else Stream(chan)
+
+
+def map(fn, chan):
+    """Applies `fn` to each item of `chan`.
+
+    :returns: Stream of results.
+    :rtype: Stream
+
+    """
+    return _stream(chan).with_stage(_MAP, fn)
+
+
+def filter(fn, chan):
+    """Passes only items of `chan` for which `fn` returns true.
+
+    :returns: Stream of items.
+    :rtype: Stream
+
+    """
+    return _stream(chan).with_stage(_FILTER, fn)
+
+
+def _is_closed(val, chan):
+    return val is None and chan.closed
+
+
+def take(n, chan):
+    """Passes first `n` items of `chan`, after them result is closed.
+
+    :returns: Channel of items.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        for _ in range(n):
+            val = yield chan.get()
+            if _is_closed(val, chan):
+                break
+            yield result.put(val)
+        result.close()
+
+    aux()
+    return result
+
+
+def reduce(fn, chan, init):
+    """Folds items of `chan` with `fn`, starting from `init`. Folded value
+    passed when `chan` closed, after it result is closed.
+
+    Usage:
+
+    .. code-block:: python
+
+        total = streams.reduce(lambda acc, x: acc + x, chan, 0)
+        print((yield total.get()))
+
+    :returns: Channel of single folded value.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        acc = init
+        while True:
+            val = yield chan.get()
+            if _is_closed(val, chan):
+                break
+            acc = fn(acc, val)
+        yield result.put(acc)
+        result.close()
+
+    aux()
+    return result
+
+
+def batch(n, chan, timeout=None):
+    """Groups items of `chan` in lists of `n` items, with `timeout`
+    incomplete list passed when `timeout` seconds passed after its first
+    item.
+
+    :param timeout: Max delay of incomplete batch in seconds.
+    :type timeout: float
+    :returns: Channel of lists.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        done = False
+        while not done:
+            val = yield chan.get()
+            if _is_closed(val, chan):
+                break
+            items = [val]
+            deadline = None if timeout is None else time() + timeout
+            while len(items) < n:
+                if deadline is None:
+                    val = yield chan.get()
+                else:
+                    ready_chan, val = yield alts(
+                        chan, timeout=max(0, deadline - time()))
+                    if ready_chan is None:
+                        break
+                done = _is_closed(val, chan)
+                if done:
+                    break
+                items.append(val)
+            yield result.put(items)
+        result.close()
+
+    aux()
+    return result
+
+
+def window(n, chan):
+    """Passes sliding windows of last `n` items of `chan`, the first
+    window passed when `n` items received.
+
+    :returns: Channel of lists.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        items = deque((), n)
+        while True:
+            val = yield chan.get()
+            if _is_closed(val, chan):
+                break
+            items.append(val)
+            if len(items) == n:
+                yield result.put(list(items))
+        result.close()
+
+    aux()
+    return result
+
+
+def merge(*chans):
+    """Passes items from all `chans` in order of arrival, result is closed
+    when all channels closed.
+
+    :returns: Channel of items.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        active = list(chans)
+        while active:
+            chan, val = yield alts(*active)
+            if _is_closed(val, chan):
+                active.remove(chan)
+            else:
+                yield result.put(val)
+        result.close()
+
+    aux()
+    return result
+
+
+def debounce(sec, chan):
+    """Passes item only when no other items received during `sec`
+    seconds after it.
+
+    :returns: Channel of items.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        val = yield chan.get()
+        while not _is_closed(val, chan):
+            ready_chan, next_val = yield alts(chan, timeout=sec)
+            if ready_chan is None:
+                yield result.put(val)
+                next_val = yield chan.get()
+            elif _is_closed(next_val, chan):
+                yield result.put(val)
+            val = next_val
+        result.close()
+
+    aux()
+    return result
+
+
+def throttle(sec, chan):
+    """Passes at most one item per `sec` seconds, other items dropped.
+
+    :returns: Channel of items.
+    :rtype: Channel
+
+    """
+    result = Channel()
+
+    @coroutine
+    def aux():
+        allowed = 0
+        while True:
+            val = yield chan.get()
+            if _is_closed(val, chan):
+                break
+            now = time()
+            if now >= allowed:
+                allowed = now + sec
+                yield result.put(val)
+        result.close()
+
+    aux()
+    return result
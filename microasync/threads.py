@@ -0,0 +1,167 @@
+"""Offloading of blocking calls to threads, CPython only.
+
+Usage:
+
+.. code-block:: python
+
+    from microasync.threads import run_in_executor
+
+    @coroutine
+    def reader(path):
+        data = yield run_in_executor(read_file, path)
+        print(data)
+
+"""
+from collections import deque
+import threading
+from microasync.utils import Promise
+from microasync.async import Waiter, get_waiter, set_waiter,\
+    call_soon_threadsafe
+
+
+class EventWaiter(Waiter):
+    """Waiter which can be woken up from other threads."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def notify(self):
+        self._event.set()
+
+
+def install_waiter():
+    """Replaces default sleeping waiter of main loop with `EventWaiter`."""
+    if get_waiter().__class__ is Waiter:
+        set_waiter(EventWaiter())
+
+
+class ThreadPool(object):
+    """Pool of worker threads for blocking calls.
+
+    Usage:
+
+    .. code-block:: python
+
+        pool = ThreadPool(size=2, max_queue=10)
+        angle = yield pool.submit(servo.angle)
+
+    """
+
+    def __init__(self, size=4, max_queue=None):
+        """
+        :param size: Count of worker threads.
+        :type size: int
+        :param max_queue: Max count of calls waiting for free worker,
+                          other calls wait inside of scheduler. Equal to
+                          `size` by default.
+        :type max_queue: int
+
+        """
+        self._size = size
+        self._max_queue = size if max_queue is None else max_queue
+        self._jobs = deque()
+        self._lock = threading.Condition()
+        self._backlog = deque()
+        self._pending = 0
+        self._threads = []
+
+    def submit(self, fn, *args):
+        """Calls `fn` in worker thread. When `fn` raises an exception
+        promise rejected with it.
+
+        :param fn: Blocking function.
+        :returns: Promise delivered with result of call.
+        :rtype: Promise
+
+        """
+        install_waiter()
+        promise = Promise()
+        job = (promise, fn, args)
+        if self._pending < self._size + self._max_queue:
+            self._dispatch(job)
+        else:
+            self._backlog.append(job)
+        return promise
+
+    def shutdown(self):
+        """Stops all worker threads after finishing queued calls."""
+        with self._lock:
+            for _ in self._threads:
+                self._jobs.append(None)
+            self._lock.notify_all()
+        self._threads = []
+
+    def _dispatch(self, job):
+        """Passes job to workers, starts new worker when needed."""
+        self._pending += 1
+        if len(self._threads) < min(self._size, self._pending):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        with self._lock:
+            self._jobs.append(job)
+            self._lock.notify()
+
+    def _work(self):
+        """Main loop of worker thread."""
+        while True:
+            with self._lock:
+                while not self._jobs:
+                    self._lock.wait()
+                job = self._jobs.popleft()
+            if job is None:
+                return
+            promise, fn, args = job
+            result = error = None
+            try:
+                result = fn(*args)
+            except Exception as e:
+                error = e
+            call_soon_threadsafe(self._done, promise, result, error)
+
+    def _done(self, promise, result, error):
+        """Delivers result in scheduler thread."""
+        self._pending -= 1
+        if self._backlog:
+            self._dispatch(self._backlog.popleft())
+        if error is None:
+            promise.delivery(result)
+        else:
+            promise.reject(error)
+
+
+_default_pool = [None]
+
+
+def set_default_pool(pool):
+    """Sets pool used by `run_in_executor`.
+
+    :type pool: ThreadPool
+
+    """
+    _default_pool[0] = pool
+
+
+def run_in_executor(fn, *args):
+    """Calls blocking `fn` in default thread pool, should be used only
+    inside coroutine.
+
+    Usage:
+
+    .. code-block:: python
+
+        angle = yield run_in_executor(servo.angle)
+
+    :param fn: Blocking function.
+    :returns: Promise delivered with result of call.
+    :rtype: Promise
+
+    """
+    if _default_pool[0] is None:
+        _default_pool[0] = ThreadPool()
+    return _default_pool[0].submit(fn, *args)
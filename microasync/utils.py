@@ -1,34 +1,68 @@
 """Helpers for internal use only!"""
-try:
-    import pyb
-except ImportError:
-    class pyb(object):
-        _counter = 0
-
-        @classmethod
-        def rng(cls):
-            try:
-                return cls._counter
-            finally:
-                cls._counter += 1
 
 
 class WithEquality(object):
-    """Class for avoiding micropython limitations with objects equality."""
+    """Class for avoiding micropython limitations with objects equality.
+    Each object gets unique id from monotonic counter, so objects can be
+    compared and used as keys of dicts and sets."""
+    __slots__ = ('_id',)
+    _counter = 0
 
     def __init__(self):
-        self._id = pyb.rng()
+        WithEquality._counter += 1
+        self._id = WithEquality._counter
 
     def __eq__(self, other):
-        return isinstance(other, WithEquality) and self._id == other._id
+        return self is other or (isinstance(other, WithEquality)
+                                 and self._id == other._id)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._id
+
+
+# Delivered promises available for reuse, disabled when limit is zero:
+_free_promises = []
+_free_promises_limit = [0]
+
+
+def set_promises_pool(limit):
+    """Enables recycling of delivered promises awaited by coroutines.
+    Should be enabled only when coroutines don't keep references to
+    yielded promises.
+
+    :param limit: Max count of promises in pool, `0` disables pool.
+    :type limit: int
+
+    """
+    _free_promises_limit[0] = limit
+    del _free_promises[limit:]
 
 
 class Promise(WithEquality):
+    __slots__ = ('delivered', 'value', 'error', '_callbacks')
 
     def __init__(self):
         super(Promise, self).__init__()
         self.delivered = False
         self.value = None
+        self.error = None
+        self._callbacks = None
+
+    @staticmethod
+    def acquire():
+        """Returns promise from pool or creates new one. Only promises
+        created by `acquire` are recycled by `release`."""
+        if _free_promises:
+            return _free_promises.pop()
+        else:
+            return _PooledPromise()
+
+    def release(self):
+        """Returns delivered promise to pool, does nothing for promises
+        not created by `acquire`."""
 
     def delivery(self, value):
         if self.delivered:
@@ -36,10 +70,47 @@ class Promise(WithEquality):
         else:
             self.value = value
             self.delivered = True
+            callbacks = self._callbacks
+            if callbacks is not None:
+                self._callbacks = None
+                for callback in callbacks:
+                    callback(self)
             return True
 
+    def reject(self, error):
+        """Delivers promise with exception instead of value, coroutine
+        which waits for promise receives it raised from `yield`.
+
+        :param error: Exception.
+        :type error: Exception
+
+        """
+        if self.delivered:
+            return False
+        self.error = error
+        return self.delivery(None)
+
+    def __await__(self):
+        """Makes promise awaitable inside of native coroutines."""
+        if self.delivered:
+            if self.error is not None:
+                raise self.error
+            return self.value
+        return (yield self)
+
+    def on_delivery(self, callback):
+        """Calls `callback` with promise when it will be delivered or
+        immediately when it already delivered."""
+        if self.delivered:
+            callback(self)
+        elif self._callbacks is None:
+            self._callbacks = [callback]
+        else:
+            self._callbacks.append(callback)
+
 
 class Atom(WithEquality):
+    __slots__ = ('value',)
 
     def __init__(self, value=None):
         super(Atom, self).__init__()
@@ -50,3 +121,16 @@ class Atom(WithEquality):
 
     def swap(self, fn):
         self.reset(fn(self.value))
+
+
+class _PooledPromise(Promise):
+    """Promise created by `Promise.acquire` for single consumer, can be
+    recycled. Internal use only!"""
+    __slots__ = ()
+
+    def release(self):
+        if self.delivered and len(_free_promises) < _free_promises_limit[0]:
+            self.delivered = False
+            self.value = None
+            self.error = None
+            _free_promises.append(self)
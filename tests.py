@@ -1,8 +1,27 @@
+import asyncio
+import multiprocessing
+import os
+import threading
 from unittest import TestCase
-from time import sleep
-from microasync.utils import WithEquality, Promise, Atom
+from time import sleep, time
+from microasync.utils import WithEquality, Promise, Atom, set_promises_pool
 from microasync.async import Channel, SlidingChannel, CoroutineBlock, coroutine, process_all,\
-    clone, Delay, ChannelProducer
+    clone, Delay, ChannelProducer, ready, next_timeout,\
+    get_waiter, ThreadSafeChannel, run_until, alts, select, Mult,\
+    DroppingChannel, Cancelled, timers, FixedBuffer, DroppingBuffer,\
+    SlidingBuffer, UnboundedBuffer, do_all, gather,\
+    FIRST_COMPLETED, ALL_COMPLETED, set_error_handler,\
+    Supervisor, ONE_FOR_ONE, ONE_FOR_ALL, as_chan, Waiter, set_waiter
+from microasync.interop import attach, to_future, from_future
+from microasync.threads import ThreadPool, run_in_executor
+from microasync.shard import ShardedRuntime, ProcessChannel, _Closed
+from microasync.buffer_channel import BufferChannel
+from microasync import streams
+from microasync import device, fake_pyb
+from microasync.pool import Pool
+from microasync.io import read_chan, write_chan, tcp_connect, tcp_server,\
+    SelectorWaiter, get_io_waiter
+from microasync.device import _Sampler, _changed, _poll, _pollers
 
 
 class WithEqualityTestCase(TestCase):
@@ -16,6 +35,12 @@ class WithEqualityTestCase(TestCase):
         second = WithEquality()
         self.assertNotEqual(first, second)
 
+    def test_hashable(self):
+        first = WithEquality()
+        second = WithEquality()
+        self.assertEqual({first: 1, second: 2}[first], 1)
+        self.assertEqual(len({first, second, first}), 2)
+
 
 class PromiseTestCase(TestCase):
 
@@ -36,6 +61,55 @@ class PromiseTestCase(TestCase):
         self.assertFalse(prom.delivery(52))
         self.assertEqual(prom.value, 12)
 
+    def test_on_delivery(self):
+        prom = Promise()
+        result = []
+        prom.on_delivery(lambda p: result.append(p.value))
+        self.assertEqual(result, [])
+        prom.delivery(12)
+        prom.on_delivery(lambda p: result.append(p.value))
+        self.assertEqual(result, [12, 12])
+
+    def test_pool(self):
+        set_promises_pool(1)
+        try:
+            prom = Promise.acquire()
+            prom.release()
+            self.assertIsNot(Promise.acquire(), prom)
+            prom.delivery(12)
+            prom.release()
+            self.assertIs(Promise.acquire(), prom)
+            self.assertFalse(prom.delivered)
+            self.assertIsNone(prom.value)
+        finally:
+            set_promises_pool(0)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Promise().extra = True
+
+    def test_pool_skips_user_promises(self):
+        set_promises_pool(8)
+        try:
+            event = Promise()
+            woken = []
+
+            @coroutine
+            def waiter(name):
+                yield event
+                woken.append(name)
+
+            waiter('a')
+            waiter('b')
+            process_all()
+            event.delivery(True)
+            for _ in range(3):
+                process_all()
+            self.assertEqual(woken, ['a', 'b'])
+            self.assertTrue(event.delivered)
+        finally:
+            set_promises_pool(0)
+
 
 class AtomTestCase(TestCase):
 
@@ -81,6 +155,60 @@ class ChannelTestCase(TestCase):
             self.assertTrue(prom.delivered)
             self.assertEqual(prom.value, n)
 
+    def test_rendezvous_with_parked_getter(self):
+        chan = Channel()
+        get_prom = chan.get()
+        self.assertFalse(get_prom.delivered)
+        put_prom = chan.put(12)
+        self.assertTrue(put_prom.value)
+        self.assertEqual(get_prom.value, 12)
+        self.assertFalse(chan.buffer)
+
+    def test_getter_releases_parked_putter(self):
+        chan = Channel()
+        put_proms = [chan.put(0)]
+        while put_proms[-1].delivered:
+            put_proms.append(chan.put(len(put_proms)))
+        put_prom = put_proms[-1]
+        get_prom = chan.get()
+        self.assertEqual(get_prom.value, 0)
+        self.assertTrue(put_prom.delivered)
+
+    def test_put_many(self):
+        chan = Channel(limit=3)
+        put_prom = chan.put_many(range(10))
+        self.assertFalse(put_prom.delivered)
+        get_proms = [chan.get() for _ in range(10)]
+        self.assertTrue(put_prom.value)
+        self.assertEqual([prom.value for prom in get_proms], list(range(10)))
+
+    def test_get_many(self):
+        chan = Channel(limit=3)
+        for n in range(10):
+            chan.put(n)
+        prom = chan.get_many(8)
+        self.assertEqual(prom.value, list(range(8)))
+        prom = chan.get_many(8)
+        self.assertEqual(prom.value, [8, 9])
+
+    def test_get_many_parked(self):
+        chan = Channel()
+        prom = chan.get_many(8)
+        self.assertFalse(prom.delivered)
+        chan.put(1)
+        self.assertEqual(prom.value, [1])
+        prom = chan.get_many(8)
+        chan.close()
+        self.assertEqual(prom.value, [])
+
+    def test_burst_keeps_order(self):
+        chan = Channel(limit=10)
+        put_proms = [chan.put(x) for x in range(1000)]
+        get_proms = [chan.get() for _ in range(1000)]
+        chan.process()
+        self.assertTrue(all(prom.value for prom in put_proms))
+        self.assertEqual([prom.value for prom in get_proms], list(range(1000)))
+
 
 class SlidingChannelTestCase(TestCase):
 
@@ -214,6 +342,51 @@ class DelayTestCase(TestCase):
         process_all()
         self.assertTrue(delay.delivered)
 
+    def test_expires_in_deadline_order(self):
+        result = []
+        for sec in (0.03, 0.01, 0.02):
+            Delay(sec).on_delivery(lambda prom: result.append(prom._sec))
+        sleep(0.05)
+        process_all()
+        self.assertEqual(result, [0.01, 0.02, 0.03])
+
+    def test_get_reuses_timer(self):
+        delay = Delay(0)
+        timer = delay._timer
+        self.assertIs(delay.get(), delay)
+        process_all()
+        self.assertTrue(delay.delivered)
+        tick = delay.get()
+        self.assertIsNot(tick, delay)
+        self.assertIs(delay._timer, timer)
+        self.assertTrue(delay.delivered)
+        self.assertFalse(tick.delivered)
+        process_all()
+        self.assertTrue(tick.delivered)
+
+    def test_shared_periodic_delay(self):
+        delay = Delay(0.001)
+        ticks = {'a': 0, 'b': 0}
+
+        @coroutine
+        def ticker(name):
+            for _ in range(3):
+                yield delay.get()
+                ticks[name] += 1
+
+        ticker('a')
+        ticker('b')
+        for _ in range(50):
+            process_all()
+            sleep(0.002)
+        self.assertEqual(ticks, {'a': 3, 'b': 3})
+
+    def test_next_timeout(self):
+        while ready:
+            process_all()
+        Delay(10)
+        self.assertTrue(9 < next_timeout() <= 10)
+
 
 class ChanProducerTestCase(TestCase):
 
@@ -228,3 +401,1448 @@ class ChanProducerTestCase(TestCase):
             while not prom.delivered:
                 process_all()
             self.assertEqual(prom.value, 12)
+
+
+class SchedulerTestCase(TestCase):
+
+    def setUp(self):
+        while ready:
+            process_all()
+
+    def test_parked_block_not_processed(self):
+        chan = Channel()
+        result = []
+
+        @coroutine
+        def aux():
+            result.append((yield chan.get()))
+
+        block = aux()
+        while ready:
+            process_all()
+        self.assertTrue(block.parked)
+        chan.put(12)
+        self.assertEqual(list(ready), [block])
+        process_all()
+        self.assertEqual(result, [12])
+
+    def test_closed_channel(self):
+        chan = Channel()
+        prom = chan.get()
+        chan.close()
+        process_all()
+        self.assertTrue(prom.delivered)
+        self.assertIsNone(prom.value)
+
+
+class NativeCoroutineTestCase(TestCase):
+
+    def test_await_promises(self):
+        chan = Channel()
+
+        @coroutine
+        async def consumer():
+            return (await chan.get()) + (await chan.get())
+
+        prom = consumer()
+        process_all()
+        chan.put(1)
+        chan.put(2)
+        while not prom.delivered:
+            process_all()
+        self.assertEqual(prom.value, 3)
+
+
+class AsyncioInteropTestCase(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.driver = attach(self.loop)
+
+    def tearDown(self):
+        self.driver.stop()
+        self.loop.close()
+
+    def test_asyncio_awaits_channel(self):
+        chan = Channel()
+
+        @coroutine
+        def producer():
+            yield Delay(0.01)
+            yield chan.put(12)
+
+        producer()
+        result = self.loop.run_until_complete(
+            asyncio.wait_for(to_future(chan.get(), self.loop), 1))
+        self.assertEqual(result, 12)
+
+    def test_coroutine_awaits_asyncio(self):
+
+        @coroutine
+        def consumer():
+            val = yield from_future(asyncio.sleep(0.01, result=5), self.loop)
+            return val * 2
+
+        result = self.loop.run_until_complete(
+            asyncio.wait_for(to_future(consumer(), self.loop), 1))
+        self.assertEqual(result, 10)
+
+
+class ThreadPoolTestCase(TestCase):
+
+    def _wait(self, prom):
+        while not prom.delivered:
+            process_all()
+            get_waiter().wait(0.1)
+
+    def test_run_in_executor(self):
+        @coroutine
+        def aux():
+            return (yield run_in_executor(lambda x: x * 2, 21))
+
+        prom = aux()
+        self._wait(prom)
+        self.assertEqual(prom.value, 42)
+
+    def test_queue_depth_limit(self):
+        pool = ThreadPool(size=1, max_queue=1)
+        proms = [pool.submit(sleep, 0.01) for _ in range(5)]
+        self.assertEqual(pool._pending, 2)
+        self.assertEqual(len(pool._backlog), 3)
+        self._wait(proms[-1])
+        self.assertTrue(all(prom.delivered for prom in proms))
+        pool.shutdown()
+
+
+class ThreadSafeChannelTestCase(TestCase):
+
+    def test_put_from_threads(self):
+        chan = ThreadSafeChannel(ring_size=8, lock=threading.Lock())
+
+        def producer(start):
+            for n in range(start, start + 50):
+                while not chan.put_threadsafe(n):
+                    sleep(0.001)
+
+        @coroutine
+        def consumer():
+            result = []
+            for _ in range(100):
+                result.append((yield chan.get()))
+            return result
+
+        prom = consumer()
+        threads = [threading.Thread(target=producer, args=(start,))
+                   for start in (0, 50)]
+        for thread in threads:
+            thread.start()
+        result = run_until(prom)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(result), list(range(100)))
+
+    def _latency(self, chan):
+        """Returns seconds between putting from thread and receiving."""
+        put_at = []
+
+        def producer():
+            sleep(0.05)
+            put_at.append(time())
+            chan.put_threadsafe(True)
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        run_until(chan.get())
+        received_at = time()
+        thread.join()
+        return received_at - put_at[0]
+
+    def test_put_wakes_up_loop(self):
+        waiter = get_waiter()
+        set_waiter(Waiter())
+        try:
+            chan = ThreadSafeChannel()
+            self.assertIsNot(get_waiter().__class__, Waiter)
+            self.assertLess(self._latency(chan), 0.1)
+        finally:
+            set_waiter(waiter)
+
+    def test_put_wakes_up_default_waiter(self):
+        chan = ThreadSafeChannel()
+        waiter = get_waiter()
+        set_waiter(Waiter())
+        try:
+            self.assertLess(self._latency(chan), 0.1)
+        finally:
+            set_waiter(waiter)
+
+    def test_drops_when_ring_full(self):
+        chan = ThreadSafeChannel(ring_size=2)
+        self.assertTrue(chan.put_threadsafe(1))
+        self.assertTrue(chan.put_threadsafe(2))
+        self.assertFalse(chan.put_threadsafe(3))
+        self.assertEqual(chan.dropped, 1)
+        process_all()
+        self.assertEqual(chan.get().value, 1)
+        self.assertEqual(chan.get().value, 2)
+
+
+def _square(inp, out):
+    while True:
+        val = yield inp.get()
+        if val is None:
+            break
+        yield out.put(val * val)
+
+
+def _broken_worker():
+    yield Delay(0)
+    raise ValueError('broken')
+
+
+def _check_fresh_id(chan):
+    if chan._id > WithEquality._counter or Channel() == chan:
+        raise AssertionError('Id of channel is copied from other process')
+    yield Delay(0)
+
+
+class ShardedRuntimeTestCase(TestCase):
+
+    def test_affinity(self):
+        runtime = ShardedRuntime(workers=3)
+        self.assertEqual([runtime.spawn(_square) for _ in range(4)],
+                         [0, 1, 2, 0])
+        self.assertEqual(runtime.spawn(_square, affinity='a'),
+                         runtime.spawn(_square, affinity='a'))
+
+    def test_failed_worker_exit_code(self):
+        runtime = ShardedRuntime(workers=1)
+        runtime.spawn(_broken_worker)
+        runtime.start()
+        self.assertEqual(run_until(runtime.join()), [1])
+
+    def test_idle_getters_dont_occupy_pool(self):
+        chans = [ProcessChannel() for _ in range(8)]
+        getters = [chan.get() for chan in chans]
+        self.assertEqual(run_until(run_in_executor(lambda: 42)), 42)
+        for chan in chans:
+            chan.close()
+        self.assertEqual([run_until(prom) for prom in getters], [None] * 8)
+
+    def test_closing_doesnt_block_on_full_queue(self):
+        chan = ProcessChannel()
+        chan._queue.put(1)
+        self.assertIsNone(chan._received(_Closed))
+        self.assertTrue(chan.closed)
+        self.assertEqual(chan._queue.get(timeout=1), 1)
+        self.assertIs(chan._queue.get(timeout=1), _Closed)
+
+    def test_fresh_id_in_spawned_process(self):
+        context = multiprocessing.get_context('spawn')
+        WithEquality._counter += 100000  # ahead of counter of child
+        chan = ProcessChannel(context=context)
+        runtime = ShardedRuntime(workers=1, context=context)
+        runtime.spawn(_check_fresh_id, chan)
+        runtime.start()
+        self.assertEqual(run_until(runtime.join()), [0])
+
+    def test_pipeline(self):
+        inp = ProcessChannel()
+        out = ProcessChannel()
+        runtime = ShardedRuntime(workers=2)
+        runtime.spawn(_square, inp, out)
+        runtime.spawn(_square, inp, out)
+        runtime.start()
+
+        @coroutine
+        def producer():
+            for n in range(10):
+                yield inp.put(n)
+            inp.close()
+
+        @coroutine
+        def consumer():
+            result = []
+            for _ in range(10):
+                result.append((yield out.get()))
+            return result
+
+        producer()
+        self.assertEqual(sorted(run_until(consumer())),
+                         [n * n for n in range(10)])
+        self.assertEqual(run_until(runtime.join()), [0, 0])
+
+
+def _frames_producer(frames):
+    for n in range(5):
+        view = yield frames.reserve()
+        view[:3] = bytes([n] * 3)
+        frames.commit(3)
+
+
+class BufferChannelTestCase(TestCase):
+
+    def test_zero_copy(self):
+        frames = BufferChannel(slots=2, slot_size=4)
+        view = frames.reserve().value
+        view[:2] = b'ab'
+        frames.commit(2)
+        frame = frames.get().value
+        self.assertEqual(bytes(frame), b'ab')
+        view[0] = ord('x')
+        self.assertEqual(bytes(frame), b'xb')
+
+    def test_waits_for_free_slot(self):
+        frames = BufferChannel(slots=2, slot_size=4)
+        self.assertTrue(frames.put(b'a').value)
+        self.assertTrue(frames.put(b'bc').value)
+        prom = frames.put(b'def')
+        self.assertFalse(prom.delivered)
+        self.assertEqual(bytes(frames.get().value), b'a')
+        frames.release()
+        self.assertTrue(prom.delivered)
+        self.assertEqual(bytes(frames.get().value), b'bc')
+        frames.release()
+        self.assertEqual(bytes(frames.get().value), b'def')
+
+    def test_put_too_long(self):
+        frames = BufferChannel(slots=2, slot_size=4)
+        with self.assertRaises(ValueError):
+            frames.put(b'toolong')
+        frames.put(b'ok')
+        self.assertEqual(bytes(frames.get().value), b'ok')
+
+    def test_shared_between_processes(self):
+        frames = BufferChannel(slots=2, slot_size=4, shared=True)
+        runtime = ShardedRuntime(workers=1)
+        runtime.spawn(_frames_producer, frames)
+        runtime.start()
+
+        @coroutine
+        def consumer():
+            result = []
+            for _ in range(5):
+                frame = yield frames.get()
+                result.append(bytes(frame))
+                frame.release()
+                frames.release()
+            return result
+
+        self.assertEqual(run_until(consumer()),
+                         [bytes([n] * 3) for n in range(5)])
+        run_until(runtime.join())
+        frames.unlink()
+
+    def test_idle_shared_getters_dont_occupy_pool(self):
+        channels = [BufferChannel(slots=1, slot_size=4, shared=True)
+                    for _ in range(8)]
+        getters = [frames.get() for frames in channels]
+        self.assertEqual(run_until(run_in_executor(lambda: 42)), 42)
+        for frames in channels:
+            frames.put(b'ab')
+        self.assertEqual([bytes(run_until(prom)) for prom in getters],
+                         [b'ab'] * 8)
+
+    def test_fresh_id_in_spawned_process(self):
+        context = multiprocessing.get_context('spawn')
+        WithEquality._counter += 100000  # ahead of counter of child
+        frames = BufferChannel(slots=1, slot_size=4, shared=True,
+                               context=context)
+        runtime = ShardedRuntime(workers=1, context=context)
+        runtime.spawn(_check_fresh_id, frames)
+        runtime.start()
+        self.assertEqual(run_until(runtime.join()), [0])
+
+
+class AltsTestCase(TestCase):
+
+    def test_ready_channel(self):
+        first = Channel()
+        second = Channel()
+        second.put(12)
+        self.assertEqual(alts(first, second).value, (second, 12))
+
+    def test_waits_and_unregisters_from_losers(self):
+        first = Channel()
+        second = Channel()
+        prom = alts(first, second)
+        self.assertFalse(prom.delivered)
+        first.put(1)
+        self.assertEqual(prom.value, (first, 1))
+        second.put(2)
+        self.assertEqual(second.get().value, 2)
+
+    def test_priority(self):
+        first = Channel()
+        second = Channel()
+        first.put(1)
+        second.put(2)
+        for _ in range(3):
+            self.assertEqual(alts(first, second, priority=True).value[0],
+                             first)
+            first.put(1)
+
+    def test_default(self):
+        chan = Channel()
+        self.assertEqual(alts(chan, default=5).value, (None, 5))
+        chan.put(1)
+        self.assertEqual(chan.get().value, 1)
+
+    def test_timeout(self):
+        prom = alts(Channel(), timeout=0.01)
+        sleep(0.02)
+        process_all()
+        self.assertEqual(prom.value, (None, None))
+
+    def test_no_leaks_in_loop(self):
+        idle = Channel()
+        busy = Channel()
+        sel = select(idle, busy)
+        for n in range(100):
+            busy.put(n)
+            self.assertEqual(sel.get().value, (busy, n))
+        self.assertLessEqual(len(idle._get_queue), 1)
+
+
+class MultTestCase(TestCase):
+
+    def test_broadcast_in_single_step(self):
+        source = Channel()
+        mult = Mult(source)
+        taps = [mult.tap() for _ in range(10)]
+        process_all()
+        source.put(12)
+        process_all()
+        self.assertEqual([tap.get().value for tap in taps], [12] * 10)
+
+    def test_buffer_policies(self):
+        source = Channel()
+        mult = Mult(source)
+        sliding = mult.tap(SlidingChannel())
+        dropping = mult.tap(DroppingChannel())
+        blocking = mult.tap(Channel(limit=10))
+        for n in range(4):
+            source.put(n)
+            while ready:
+                process_all()
+        self.assertEqual(sliding.get().value, 3)
+        self.assertEqual(dropping.get().value, 0)
+        self.assertEqual(blocking.get().value, 0)
+
+    def test_untap_releases_blocked_mult(self):
+        source = Channel()
+        mult = Mult(source)
+        blocking = Channel()
+        zeros = 1
+        while blocking.put(0).delivered:
+            zeros += 1
+        mult.tap(blocking)
+        other = mult.tap(SlidingChannel())
+        source.put(1)
+        while ready:
+            process_all()
+        mult.untap(blocking)
+        source.put(2)
+        while ready:
+            process_all()
+        self.assertEqual(other.get().value, 2)
+        self.assertEqual([blocking.get().value for _ in range(zeros)],
+                         [0] * zeros)
+        self.assertFalse(blocking.get().delivered)
+
+    def test_untap_with_promises_pool(self):
+        set_promises_pool(16)
+        try:
+            source = Channel()
+            mult = Mult(source)
+            blocking = mult.tap(Channel())
+            other = mult.tap(Channel(limit=10))
+            for n in range(3):
+                source.put(n)
+            while ready:
+                process_all()
+            mult.untap(blocking)
+            self.assertFalse(blocking._put_queue)
+            source.put(3)
+            while ready:
+                process_all()
+            self.assertEqual([other.get().value for _ in range(4)],
+                             [0, 1, 2, 3])
+            self.assertFalse(other.get().delivered)
+        finally:
+            set_promises_pool(0)
+
+
+class CancellationTestCase(TestCase):
+
+    def test_cancel_parked_coroutine(self):
+        chan = Channel()
+        result = []
+
+        @coroutine
+        def aux():
+            result.append((yield chan.get()))
+
+        block = aux()
+        process_all()
+        self.assertTrue(block.cancel())
+        self.assertTrue(block.delivered)
+        prom = chan.get()
+        chan.put(1)
+        self.assertEqual(prom.value, 1)
+        self.assertEqual(result, [])
+        self.assertFalse(chan._get_queue)
+
+    def test_cleanup_on_cancel(self):
+        chan = Channel()
+
+        @coroutine
+        def aux():
+            try:
+                yield chan.get()
+            except Cancelled:
+                yield chan.put('cleanup')
+                return 'cancelled'
+
+        block = aux()
+        process_all()
+        self.assertFalse(block.cancel())
+        self.assertEqual(chan.get().value, 'cleanup')
+        while ready:
+            process_all()
+        self.assertEqual(block.value, 'cancelled')
+
+    def test_get_timeout(self):
+        chan = Channel()
+        prom = chan.get(timeout=0.01)
+        sleep(0.02)
+        process_all()
+        self.assertTrue(prom.delivered)
+        self.assertIsNone(prom.value)
+        chan.put(1)
+        self.assertEqual(chan.get(timeout=10).value, 1)
+
+    def test_put_timeout(self):
+        chan = Channel()
+        while chan.put(0).delivered:
+            pass
+        prom = chan.put(1, timeout=0.01)
+        sleep(0.02)
+        process_all()
+        self.assertFalse(prom.value)
+        values = []
+        while True:
+            get_prom = chan.get()
+            if not get_prom.delivered:
+                break
+            values.append(get_prom.value)
+        self.assertNotIn(1, values)
+
+    def test_cancel_keeps_shared_promise(self):
+        event = Promise()
+
+        @coroutine
+        def waiter():
+            return (yield event)
+
+        first = waiter()
+        second = waiter()
+        process_all()
+        first.cancel()
+        self.assertFalse(event.delivered)
+        self.assertTrue(event.delivery('real'))
+        process_all()
+        self.assertEqual(second.value, 'real')
+
+    def test_cancel_abandons_pool_waiter(self):
+        pool = Pool(lambda: object(), max_size=1)
+        resource = pool.acquire().value
+
+        @coroutine
+        def waiter():
+            yield pool.acquire()
+
+        block = waiter()
+        process_all()
+        block.cancel()
+        pool.release(resource)
+        self.assertEqual(pool.idle, 1)
+
+    def test_cancelled_timers_removed(self):
+        count = len(timers)
+        delays = [Delay(100) for _ in range(100)]
+        for delay in delays:
+            delay.cancel()
+        self.assertLess(len(timers), count + 50)
+        self.assertIs(delays[0].get(), delays[0])
+        self.assertFalse(delays[0].delivered)
+
+
+class BufferTestCase(TestCase):
+
+    def _put_all(self, buffer, count):
+        chan = Channel(buffer=buffer)
+        proms = [chan.put(n) for n in range(count)]
+        return chan, proms
+
+    def test_fixed(self):
+        chan, proms = self._put_all(FixedBuffer(3), 5)
+        self.assertEqual([prom.delivered for prom in proms],
+                         [True] * 3 + [False] * 2)
+        self.assertEqual([chan.get().value for _ in range(5)],
+                         list(range(5)))
+
+    def test_unbuffered(self):
+        chan, proms = self._put_all(FixedBuffer(0), 1)
+        self.assertFalse(proms[0].delivered)
+        self.assertEqual(chan.get().value, 0)
+        self.assertTrue(proms[0].delivered)
+
+    def test_dropping(self):
+        chan, proms = self._put_all(DroppingBuffer(3), 5)
+        self.assertTrue(all(prom.value for prom in proms))
+        self.assertEqual([chan.get().value for _ in range(3)], [0, 1, 2])
+        self.assertEqual(chan.buffer.dropped, 2)
+
+    def test_sliding(self):
+        chan, proms = self._put_all(SlidingBuffer(3), 5)
+        self.assertTrue(all(prom.value for prom in proms))
+        self.assertEqual([chan.get().value for _ in range(3)], [2, 3, 4])
+        self.assertEqual(chan.buffer.dropped, 2)
+
+    def test_unbounded(self):
+        chan, proms = self._put_all(UnboundedBuffer(), 1000)
+        self.assertTrue(all(prom.value for prom in proms))
+        self.assertEqual(len(chan.buffer), 1000)
+        self.assertEqual(chan.buffer.dropped, 0)
+
+
+class StreamsTestCase(TestCase):
+
+    def _process(self):
+        process_all()
+        while ready:
+            process_all()
+
+    def _drain(self, chan):
+        values = []
+        while True:
+            self._process()
+            prom = chan.get()
+            self._process()
+            if not prom.delivered or (prom.value is None and chan.closed):
+                return values
+            values.append(prom.value)
+
+    def test_fused_stages(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        stream = streams.filter(lambda x: x % 2,
+                                streams.map(lambda x: x + 1, chan))
+        for n in range(10):
+            chan.put(n)
+        chan.close()
+        self.assertEqual(len(ready), 0)
+        self.assertEqual([stream.get().value for _ in range(5)],
+                         [1, 3, 5, 7, 9])
+        self.assertIsNone(stream.get().value)
+
+    def test_filter_skips_many(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(10000):
+            chan.put(n)
+        prom = streams.filter(lambda x: x == 9999, chan).get()
+        self.assertEqual(prom.value, 9999)
+
+    def test_filter_waits_for_item(self):
+        chan = Channel()
+        prom = streams.filter(lambda x: x > 1, chan).get()
+        chan.put(1)
+        self.assertFalse(prom.delivered)
+        chan.put(2)
+        self.assertEqual(prom.value, 2)
+
+    def test_take(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(5):
+            chan.put(n)
+        self.assertEqual(self._drain(streams.take(3, chan)), [0, 1, 2])
+
+    def test_reduce(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(5):
+            chan.put(n)
+        chan.close()
+        self.assertEqual(
+            self._drain(streams.reduce(lambda acc, x: acc + x, chan, 10)),
+            [20])
+
+    def test_batch(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(5):
+            chan.put(n)
+        chan.close()
+        self.assertEqual(self._drain(streams.batch(2, chan)),
+                         [[0, 1], [2, 3], [4]])
+
+    def test_batch_timeout(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        batches = streams.batch(10, chan, timeout=0.01)
+        chan.put(1)
+        self._process()
+        prom = batches.get()
+        self.assertFalse(prom.delivered)
+        sleep(0.02)
+        self._process()
+        self.assertEqual(prom.value, [1])
+
+    def test_window(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(4):
+            chan.put(n)
+        chan.close()
+        self.assertEqual(self._drain(streams.window(2, chan)),
+                         [[0, 1], [1, 2], [2, 3]])
+
+    def test_merge(self):
+        first = Channel(buffer=UnboundedBuffer())
+        second = Channel(buffer=UnboundedBuffer())
+        first.put(1)
+        second.put(2)
+        first.close()
+        second.close()
+        merged = streams.merge(first, second)
+        self.assertEqual(sorted(self._drain(merged)), [1, 2])
+        self.assertTrue(merged.closed)
+
+    def test_debounce(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        result = streams.debounce(0.01, chan)
+        for n in range(3):
+            chan.put(n)
+        self._process()
+        prom = result.get()
+        self.assertFalse(prom.delivered)
+        sleep(0.02)
+        self._process()
+        self.assertEqual(prom.value, 2)
+
+    def test_throttle(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        for n in range(3):
+            chan.put(n)
+        chan.close()
+        self.assertEqual(self._drain(streams.throttle(10, chan)), [0])
+
+    def test_stream_in_alts(self):
+        chan = Channel()
+        stream = streams.map(lambda x: x * 10, chan)
+        prom = alts(stream)
+        chan.put(2)
+        self.assertEqual(prom.value, (stream, 20))
+
+
+class DeviceSamplingTestCase(TestCase):
+
+    def _run(self, readings, period=0, **kwargs):
+        chan = Channel(buffer=UnboundedBuffer())
+        readings = iter(readings)
+        sampler = _Sampler(chan, lambda: next(readings), period, **kwargs)
+        now = 0
+        values = []
+        prom = chan.get()
+        for _ in range(20):
+            sampler.poll(now)
+            now = sampler.due
+            if prom.delivered:
+                values.append(prom.value)
+                prom = chan.get()
+        return values
+
+    def test_every_sample(self):
+        self.assertEqual(self._run([1, 1, 2] + [2] * 17), [1, 1, 2] + [2] * 17)
+
+    def test_change_only(self):
+        self.assertEqual(self._run([1, 1, 2, 2, 1] + [1] * 15, deadband=0),
+                         [1, 2, 1])
+
+    def test_deadband(self):
+        self.assertEqual(self._run([10, 11, 13, 12] + [12] * 16, deadband=2),
+                         [10, 13])
+
+    def test_deadband_of_tuples(self):
+        self.assertTrue(_changed((0, 0, 0), (0, 5, 0), 2))
+        self.assertFalse(_changed((0, 0, 0), (1, 1, 1), 2))
+
+    def test_debounce(self):
+        self.assertEqual(self._run([0, 0, 0, 1, 0] + [1] * 15, period=1,
+                                   deadband=0, debounce=2), [0, 1])
+
+    def test_backoff_without_reader(self):
+        chan = Channel(buffer=UnboundedBuffer())
+        reads = []
+        sampler = _Sampler(chan, lambda: reads.append(1), 0.1)
+        now = 0
+        for _ in range(10):
+            sampler.poll(now)
+            now = sampler.due
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(sampler.backoff, 32)
+        chan.get()
+        prom = chan.get()
+        sampler.poll(now)
+        self.assertEqual(len(reads), 2)
+        self.assertTrue(prom.delivered)
+        self.assertEqual(sampler.backoff, 1)
+
+    def test_backoff_of_unchanged_readings(self):
+        chan = Channel()
+        reads = []
+
+        def read():
+            reads.append(1)
+            return 1
+
+        sampler = _Sampler(chan, read, 0, deadband=0)
+        prom = chan.get()
+        sampler.poll(0)
+        self.assertEqual(prom.value, 1)
+        self.assertEqual(sampler.due, 0)
+        now = 0
+        for _ in range(10):
+            sampler.poll(now)
+            self.assertGreater(sampler.due, now)
+            now = sampler.due
+        self.assertEqual(len(reads), 11)
+        self.assertEqual(sampler.backoff, 32)
+
+    def test_pollers_share_timer(self):
+        first = _poll(SlidingChannel(), lambda: 1, rate=1000)
+        second = _poll(SlidingChannel(), lambda: 2, rate=1000)
+        self.assertEqual(len(_pollers), 1)
+        proms = [first.get(), second.get()]
+        count = len(timers)
+        for _ in range(3):
+            process_all()
+        self.assertEqual(len(timers), count + 1)
+        self.assertEqual([prom.value for prom in proms], [1, 2])
+        first.close()
+        second.close()
+        sleep(0.01)
+        for _ in range(3):
+            process_all()
+        self.assertEqual(len(_pollers), 0)
+
+
+class PinEdgesTestCase(TestCase):
+
+    def _values(self, chan):
+        process_all()
+        values = []
+        while chan.buffer:
+            values.append(chan.get().value)
+            process_all()
+        return values
+
+    def test_both_edges(self):
+        chan = device.get_pin_edges('Y1')
+        pin = fake_pyb.Pin('Y1')
+        for level in (1, 0, 1):
+            pin.drive(level)
+        self.assertEqual(self._values(chan), [1, 0, 1])
+        self.assertEqual(len(ready), 0)
+
+    def test_rising_edge(self):
+        chan = device.get_pin_edges('Y2', edge=fake_pyb.ExtInt.IRQ_RISING)
+        pin = fake_pyb.Pin('Y2')
+        for level in (1, 0, 1, 0):
+            pin.drive(level)
+        self.assertEqual(self._values(chan), [1, 1])
+
+    def test_debounce(self):
+        chan = device.get_pin_edges('Y3', debounce=1000)
+        pin = fake_pyb.Pin('Y3')
+        for level in (1, 0, 1, 0):
+            pin.drive(level)
+        self.assertEqual(self._values(chan), [1])
+
+    def test_ring_overflow(self):
+        chan = device.get_pin_edges('Y4', ring_size=2)
+        pin = fake_pyb.Pin('Y4')
+        for level in (1, 0, 1, 0):
+            pin.drive(level)
+        self.assertEqual(chan.dropped, 2)
+
+    def test_switch(self):
+        switch = device.get_switch()
+        process_all()
+        prom = switch.get()
+        fake_pyb.Switch().press()
+        for _ in range(3):
+            process_all()
+        self.assertTrue(prom.value)
+
+
+class IOTestCase(TestCase):
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+        reader = read_chan(read_fd)
+        writer = write_chan(write_fd)
+
+        @coroutine
+        def aux():
+            yield writer.put(b'hello')
+            data = yield reader.get()
+            writer.close()
+            return data
+
+        self.assertEqual(run_until(aux()), b'hello')
+        os.close(read_fd)
+        os.close(write_fd)
+
+    def test_eof_closes_channel(self):
+        read_fd, write_fd = os.pipe()
+        reader = read_chan(read_fd)
+        os.close(write_fd)
+        self.assertIsNone(run_until(reader.get()))
+        self.assertTrue(reader.closed)
+        os.close(read_fd)
+
+    def test_loop_blocks_until_readable(self):
+        read_fd, write_fd = os.pipe()
+        reader = read_chan(read_fd)
+        self.assertIsInstance(get_io_waiter(), SelectorWaiter)
+        timer = threading.Timer(0.05, os.write, (write_fd, b'x'))
+        timer.start()
+        started = time()
+        self.assertEqual(run_until(reader.get()), b'x')
+        self.assertLess(time() - started, 0.5)
+        os.close(read_fd)
+        os.close(write_fd)
+
+    def test_tcp_echo(self):
+        server = tcp_server('127.0.0.1', 0)
+
+        @coroutine
+        def echo():
+            reader, writer = yield server.get()
+            while True:
+                data = yield reader.get()
+                if data is None:
+                    break
+                yield writer.put(data.upper())
+            writer.close()
+
+        @coroutine
+        def client():
+            reader, writer = yield tcp_connect(*server.address)
+            received = []
+            for data in (b'ping', b'pong'):
+                yield writer.put(data)
+                received.append((yield reader.get()))
+            writer.close()
+            self.assertIsNone((yield reader.get()))
+            return received
+
+        echo()
+        self.assertEqual(run_until(client()), [b'PING', b'PONG'])
+        server.close()
+
+    def test_tcp_connect_refused(self):
+        server = tcp_server('127.0.0.1', 0)
+        address = server.address
+        server.close()
+        self.assertIsNone(run_until(tcp_connect(*address)))
+
+    def test_close_wakes_up_acceptor(self):
+        server = tcp_server('127.0.0.1', 0)
+        process_all()
+        waiting = server._waiting
+        self.assertFalse(waiting.delivered)
+        server.close()
+        self.assertTrue(waiting.delivered)
+        run_until(Delay(0))
+        self.assertFalse(ready)
+
+    def test_many_connections(self):
+        server = tcp_server('127.0.0.1', 0, limit=100)
+
+        @coroutine
+        def serve():
+            while True:
+                conn = yield server.get()
+                if conn is None:
+                    break
+                reader, writer = conn
+                data = yield reader.get()
+                yield writer.put(data)
+                writer.close()
+
+        @coroutine
+        def client(n):
+            reader, writer = yield tcp_connect(*server.address)
+            yield writer.put(str(n).encode())
+            data = yield reader.get()
+            writer.close()
+            return int(data)
+
+        serve()
+        results = run_until(do_all(*[client(n) for n in range(100)]))
+        self.assertEqual(results, list(range(100)))
+        server.close()
+
+
+class PoolTestCase(TestCase):
+
+    def setUp(self):
+        self.created = []
+        self.closed = []
+
+    def _pool(self, **kwargs):
+        def factory():
+            self.created.append(len(self.created))
+            return self.created[-1]
+        return Pool(factory, close=self.closed.append, **kwargs)
+
+    def test_reuse(self):
+        pool = self._pool(max_size=2)
+        first = pool.acquire().value
+        pool.release(first)
+        self.assertEqual(pool.acquire().value, first)
+        self.assertEqual(self.created, [0])
+
+    def test_max_size_and_fairness(self):
+        pool = self._pool(max_size=2)
+        first = pool.acquire()
+        second = pool.acquire()
+        waiters = [pool.acquire() for _ in range(3)]
+        self.assertEqual(pool.size, 2)
+        self.assertFalse(any(prom.delivered for prom in waiters))
+        pool.release(first.value)
+        self.assertEqual(waiters[0].value, first.value)
+        self.assertFalse(waiters[1].delivered)
+        pool.release(second.value)
+        self.assertEqual(waiters[1].value, second.value)
+        self.assertEqual(len(self.created), 2)
+
+    def test_timeout(self):
+        pool = self._pool(max_size=1)
+        first = pool.acquire()
+        waiter = pool.acquire(timeout=0.01)
+        sleep(0.02)
+        process_all()
+        self.assertTrue(waiter.delivered)
+        self.assertIsNone(waiter.value)
+        pool.release(first.value)
+        self.assertEqual(pool.idle, 1)
+
+    def test_health_check(self):
+        pool = self._pool(check=lambda res: res != 0)
+        pool.release(pool.acquire().value)
+        self.assertEqual(pool.acquire().value, 1)
+        self.assertEqual(self.closed, [0])
+        self.assertEqual(pool.size, 1)
+
+    def test_discard(self):
+        pool = self._pool(max_size=1)
+        first = pool.acquire()
+        waiter = pool.acquire()
+        pool.discard(first.value)
+        self.assertEqual(waiter.value, 1)
+        self.assertEqual(self.closed, [0])
+
+    def test_factory_error(self):
+        error = IOError('refused')
+        errors = [error]
+
+        def factory():
+            if errors:
+                raise errors.pop()
+            return 'conn'
+
+        pool = Pool(factory, max_size=1)
+        failed = pool.acquire()
+        waiting = pool.acquire()
+        self.assertIs(failed.error, error)
+        self.assertEqual(waiting.value, 'conn')
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_eviction(self):
+        pool = self._pool(idle_timeout=0.01)
+        pool.release(pool.acquire().value)
+        run_until(Delay(0.03))
+        process_all()
+        self.assertEqual(pool.idle, 0)
+        self.assertEqual(pool.size, 0)
+        self.assertEqual(self.closed, [0])
+
+    def test_close(self):
+        pool = self._pool(max_size=1)
+        first = pool.acquire()
+        waiter = pool.acquire()
+        pool.close()
+        self.assertIsNone(waiter.value)
+        pool.release(first.value)
+        self.assertEqual(self.closed, [0])
+        self.assertIsNone(pool.acquire().value)
+
+    def test_loopback_connections(self):
+        server = tcp_server('127.0.0.1', 0, limit=10)
+        accepted = []
+
+        @coroutine
+        def serve():
+            while True:
+                conn = yield server.get()
+                if conn is None:
+                    break
+                accepted.append(conn)
+                echo(*conn)
+
+        @coroutine
+        def echo(reader, writer):
+            while True:
+                data = yield reader.get()
+                if data is None:
+                    break
+                yield writer.put(data)
+            writer.close()
+
+        pool = Pool(lambda: tcp_connect(*server.address), max_size=2,
+                    check=lambda conn: not conn[0].closed,
+                    close=lambda conn: conn[1].close())
+
+        @coroutine
+        def request(n):
+            conn = yield pool.acquire()
+            yield conn[1].put(str(n).encode())
+            data = yield conn[0].get()
+            pool.release(conn)
+            return int(data)
+
+        serve()
+        results = run_until(do_all(*[request(n) for n in range(10)]))
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(len(accepted), 2)
+        pool.close()
+        server.close()
+
+
+class GatherTestCase(TestCase):
+
+    @coroutine
+    def _sleep(self, sec, value, log=None):
+        try:
+            yield Delay(sec)
+        except Cancelled:
+            log.append(value)
+            raise
+        return value
+
+    def test_parallel(self):
+        started = time()
+        result = run_until(gather(*[self._sleep(0.05, n) for n in range(5)]))
+        self.assertEqual(result, list(range(5)))
+        self.assertLess(time() - started, 0.2)
+
+    def test_empty(self):
+        self.assertEqual(gather().value, [])
+
+    def test_promises(self):
+        first = Channel()
+        second = Channel()
+        prom = gather(first.get(), second.get())
+        second.put(2)
+        first.put(1)
+        self.assertEqual(prom.value, [1, 2])
+
+    def test_first_completed(self):
+        cancelled = []
+        fast = self._sleep(0.01, 'fast', cancelled)
+        slow = self._sleep(10, 'slow', cancelled)
+        block, value = run_until(gather(slow, fast, mode=FIRST_COMPLETED))
+        self.assertIs(block, fast)
+        self.assertEqual(value, 'fast')
+        self.assertEqual(cancelled, ['slow'])
+        self.assertTrue(slow.delivered)
+
+    def test_cancel_parent_cancels_children(self):
+        cancelled = []
+        children = [self._sleep(10, n, cancelled) for n in range(3)]
+
+        @coroutine
+        def parent():
+            yield gather(*children)
+
+        block = parent()
+        for _ in range(3):
+            process_all()
+        block.cancel()
+        self.assertEqual(sorted(cancelled), [0, 1, 2])
+        self.assertTrue(all(child.delivered for child in children))
+
+    def test_no_channels(self):
+        count = WithEquality._counter
+        gather(*[Promise() for _ in range(10)])
+        self.assertEqual(WithEquality._counter - count, 11)
+
+
+class ErrorPropagationTestCase(TestCase):
+
+    def setUp(self):
+        self.unhandled = []
+        set_error_handler(lambda block, error: self.unhandled.append(error))
+
+    def tearDown(self):
+        set_error_handler(None)
+
+    @coroutine
+    def _failing(self, error):
+        yield Delay(0)
+        raise error
+
+    def test_rejected_promise_raised_in_coroutine(self):
+        prom = Promise()
+
+        @coroutine
+        def aux():
+            try:
+                yield prom
+            except ValueError as e:
+                return str(e)
+
+        block = aux()
+        process_all()
+        prom.reject(ValueError('broken'))
+        self.assertEqual(run_until(block), 'broken')
+
+    def test_child_error_raised_in_parent(self):
+        error = KeyError('key')
+
+        @coroutine
+        def parent():
+            try:
+                yield self._failing(error)
+            except KeyError as e:
+                return e
+
+        self.assertIs(run_until(parent()), error)
+        self.assertEqual(self.unhandled, [])
+
+    def test_run_until_raises_error(self):
+        error = KeyError('key')
+        with self.assertRaises(KeyError) as ctx:
+            run_until(self._failing(error))
+        self.assertIs(ctx.exception, error)
+
+    def test_run_until_raises_error_of_gather(self):
+        error = KeyError('key')
+        with self.assertRaises(KeyError) as ctx:
+            run_until(do_all(self._failing(error)))
+        self.assertIs(ctx.exception, error)
+
+    def test_unhandled_error_doesnt_stop_loop(self):
+        error = AttributeError('bug')
+        failing = self._failing(error)
+        self.assertTrue(run_until(self._sleep_value(True)))
+        self.assertEqual(self.unhandled, [error])
+        self.assertIs(failing.error, error)
+
+    @coroutine
+    def _sleep_value(self, value):
+        yield Delay(0.01)
+        return value
+
+    def test_not_generator(self):
+        @coroutine
+        def aux():
+            return 42
+
+        self.assertEqual(aux().value, 42)
+
+    def test_gather_first_exception(self):
+        cancelled = []
+
+        @coroutine
+        def slow():
+            try:
+                yield Delay(10)
+            except Cancelled:
+                cancelled.append(True)
+                raise
+
+        prom = gather(slow(), self._failing(ValueError()))
+        run_until(Delay(0.01))
+        self.assertIsInstance(prom.error, ValueError)
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(self.unhandled, [])
+
+    def test_gather_all_completed(self):
+        error = ValueError()
+        prom = gather(self._sleep_value(1), self._failing(error),
+                      mode=ALL_COMPLETED)
+        self.assertEqual(run_until(prom), [1, error])
+
+    def test_run_in_executor_error(self):
+        @coroutine
+        def aux():
+            try:
+                yield run_in_executor(int, 'x')
+            except ValueError:
+                return 'failed'
+
+        self.assertEqual(run_until(aux()), 'failed')
+
+    def test_stream_stage_error(self):
+        chan = Channel()
+        stream = streams.map(lambda x: 1 / x, chan)
+        prom = stream.get()
+        put = chan.put(0)
+        self.assertIsInstance(prom.error, ZeroDivisionError)
+        self.assertTrue(put.value)
+
+    def test_native_coroutine(self):
+        prom = Promise()
+        prom.reject(ValueError())
+
+        @coroutine
+        async def aux():
+            try:
+                await prom
+            except ValueError:
+                return 'caught'
+
+        self.assertEqual(run_until(aux()), 'caught')
+
+    def test_future_error(self):
+        loop = asyncio.new_event_loop()
+        future = loop.create_future()
+        future.set_exception(KeyError('key'))
+        prom = from_future(future, loop)
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        self.assertIsInstance(prom.error, KeyError)
+
+
+class SupervisorTestCase(TestCase):
+
+    def setUp(self):
+        self.errors = []
+        set_error_handler(lambda block, error: self.errors.append(error))
+
+    def tearDown(self):
+        set_error_handler(None)
+
+    def _run(self):
+        for _ in range(10):
+            process_all()
+
+    def test_one_for_one(self):
+        inp = Channel(buffer=UnboundedBuffer())
+        out = Channel(buffer=UnboundedBuffer())
+        starts = []
+
+        def stage(inp, out):
+            starts.append(True)
+            while True:
+                val = yield inp.get()
+                yield out.put(10 / val)
+
+        sup = Supervisor(ONE_FOR_ONE)
+        sup.start_child(stage, inp, out)
+        for val in (1, 0, 2):
+            inp.put(val)
+        self._run()
+        self.assertEqual(len(starts), 2)
+        self.assertEqual([out.get().value for _ in range(2)], [10, 5])
+        self.assertIsInstance(self.errors[0], ZeroDivisionError)
+        self.assertFalse(sup.delivered)
+
+    def test_one_for_all(self):
+        trigger = Channel()
+        starts = []
+        cancelled = []
+
+        def failing():
+            starts.append('failing')
+            yield trigger.get()
+            raise ValueError()
+
+        def sibling():
+            starts.append('sibling')
+            try:
+                yield Delay(10)
+            except Cancelled:
+                cancelled.append(True)
+                raise
+
+        sup = Supervisor(ONE_FOR_ALL)
+        sup.start_child(failing)
+        sup.start_child(sibling)
+        self._run()
+        trigger.put(True)
+        self._run()
+        self.assertEqual(starts, ['failing', 'sibling'] * 2)
+        self.assertEqual(cancelled, [True])
+
+    def test_restart_intensity(self):
+        @coroutine
+        def failing():
+            yield Delay(0)
+            raise ValueError()
+
+        sup = Supervisor(max_restarts=2, period=10)
+        sup.start_child(failing)
+        run_until(Delay(0.05))
+        self.assertIsInstance(sup.error, ValueError)
+        self.assertEqual(len(self.errors), 3)
+
+    def test_normal_exit_not_restarted(self):
+        starts = []
+
+        def child():
+            starts.append(True)
+            yield Delay(0)
+
+        sup = Supervisor()
+        sup.start_child(child)
+        run_until(Delay(0.01))
+        self.assertEqual(starts, [True])
+
+    def test_nested_and_stop(self):
+        cancelled = []
+
+        def child():
+            try:
+                yield Delay(10)
+            except Cancelled:
+                cancelled.append(True)
+                raise
+
+        root = Supervisor()
+        inner = root.start_child(Supervisor)
+        inner.start_child(child)
+        self._run()
+        root.stop()
+        self.assertTrue(inner.delivered)
+        self.assertEqual(cancelled, [True])
+
+    def test_as_chan(self):
+        sup = Supervisor()
+        starts = []
+
+        @as_chan(Channel, supervisor=sup)
+        def numbers(chan, limit):
+            starts.append(True)
+            for n in range(limit):
+                yield chan.put(n)
+            raise ValueError()
+
+        chan = numbers(2)
+        self._run()
+        values = []
+        for _ in range(4):
+            values.append(chan.get().value)
+            self._run()
+        self.assertEqual(values, [0, 1, 0, 1])
+        self.assertGreater(len(starts), 1)